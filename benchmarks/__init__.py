@@ -0,0 +1 @@
+# Benchmarks of cosmicexcelchecker on generated data, run with `python -m benchmarks.run`
@@ -0,0 +1,185 @@
+# Generate synthetic result summary and requirement folders for benchmarking
+
+from cosmicexcelchecker.conf import CFP_SHEET_NAMES, NONCFP_SHEET_NAMES, CFP_COLUMN_NAME, SUB_PROCESS_NAME, \
+    RS_SKIP_ROWS, RS_WORKLOAD_NAME, RS_TOTAL_CFP_NAME, RS_REQ_NUM, RS_REQ_NAME, RS_QLF_COSMIC, Workload_CFP_Ratio, \
+    SR_COSMIC_REQ_NAME, SR_NONCOSMIC_REQ_NAME, COEFFICIENT_SHEET_NAME, COEFFICIENT_SHEET_DATA_COL_NAME, \
+    SR_SUBFOLDER_NAME, SR_COSMIC_FILE_PREFIX, SR_NONCOSMIC_FILE_PREFIX, SR_NONCOSMIC_REQ_NUM, \
+    SR_NONCOSMIC_PROJECT_NAME, SR_FINAL_CONFIRMATION, SR_AC_REQ_NUM, SR_AC_REQ_NAME, SR_AC_REPORT_NUM, SR_AC_FINAL_NUM
+
+from openpyxl.styles import PatternFill
+from typing import NamedTuple
+
+import argparse
+import os
+import random
+import openpyxl
+import pandas as pd
+
+# fill colours recognized by `CosmicReqExcel.check_highlight_cfp`
+YELLOW_FILL = PatternFill(fill_type='solid', start_color='FFFFFF00', end_color='FFFFFF00')
+RED_FILL = PatternFill(fill_type='solid', start_color='FFFF0000', end_color='FFFF0000')
+
+# CFP of a sub-process by its fill: no fill 1, yellow 0, red 1/3
+FILL_CFP = {'none': 1, 'yellow': 0, 'red': 1 / 3}
+
+class GeneratedData(NamedTuple):
+    '''
+    Paths of the generated data
+    '''
+
+    summary_path: str
+    sheet_name: str
+    folders_path: str
+    cosmic_paths: list
+    noncosmic_paths: list
+
+def write_cosmic(path: str, req_num: int, req_name: str, rows: int, rng: random.Random,
+                 error: bool = False, extra_sheets: int = 0) -> float:
+    '''
+    Write a single cosmic requirement Excel (附件5)
+
+    :param path: path of the .xlsx file
+    :param req_num: requirement number
+    :param req_name: requirement name
+    :param rows: number of sub-process rows in the CFP sheet
+    :param rng: random generator
+    :param error: bool for whether a CFP cell disagrees with its fill colour
+    :param extra_sheets: number of unrelated worksheets, which are skipped by selective loading
+    :return: total CFP
+    '''
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = CFP_SHEET_NAMES[0]
+    ws.append([SR_COSMIC_REQ_NAME, '功能用户', SUB_PROCESS_NAME, '数据移动类型', CFP_COLUMN_NAME, '数据组', '数据属性'])
+
+    fills : list[str] = [rng.choice(['none', 'none', 'none', 'yellow', 'red']) for _ in range(rows)]
+
+    # the total CFP of real files is a whole number, drop red rows until the float sum (summed the same way as
+    # `CosmicReqExcel.get_CFP_total`) is exact
+    while True:
+        total = float(pd.Series([FILL_CFP[fill] for fill in fills], dtype=float).sum())
+        if total.is_integer() or 'red' not in fills:
+            break
+        fills[len(fills) - 1 - fills[::-1].index('red')] = 'none'
+
+    cfps : list[float] = [FILL_CFP[fill] for fill in fills]
+    if error:
+        cfps[rows // 2] = 5
+        total = float(pd.Series(cfps, dtype=float).sum())
+
+    for i, (fill, cfp) in enumerate(zip(fills, cfps)):
+        ws.append([req_name if i == 0 else None, '用户', f'子过程{i}', rng.choice('ERWX'), cfp, f'数据组{i}', '属性'])
+        if fill == 'yellow':
+            ws.cell(row=i + 2, column=3).fill = YELLOW_FILL
+        elif fill == 'red':
+            ws.cell(row=i + 2, column=3).fill = RED_FILL
+
+    coefficient = wb.create_sheet(COEFFICIENT_SHEET_NAME)
+    coefficient.append(['项目', COEFFICIENT_SHEET_DATA_COL_NAME])
+    coefficient.append(['调整因子', 1])
+    coefficient.append(['标准功能点', total])
+
+    final_confirmation = wb.create_sheet(SR_FINAL_CONFIRMATION[0])
+    final_confirmation.append([SR_FINAL_CONFIRMATION[0]])
+    final_confirmation.append([SR_AC_REQ_NUM, SR_AC_REQ_NAME, SR_AC_REPORT_NUM, SR_AC_FINAL_NUM])
+    final_confirmation.append([req_num, req_name, round(total * Workload_CFP_Ratio, 2), 1])
+
+    for k in range(extra_sheets):
+        extra = wb.create_sheet(f'附表{k}')
+        for r in range(rows):
+            extra.append([r, f'说明{r}', r * 2])
+
+    wb.save(path)
+
+    return total
+
+def write_noncosmic(path: str, req_num: int, req_name: str) -> None:
+    '''
+    Write a single non-cosmic requirement Excel (附件4)
+
+    :param path: path of the .xlsx file
+    :param req_num: requirement number
+    :param req_name: requirement name
+    :return: None
+    '''
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = NONCFP_SHEET_NAMES
+    ws.append([SR_NONCOSMIC_REQ_NUM, SR_NONCOSMIC_PROJECT_NAME, SR_NONCOSMIC_REQ_NAME, '工作量（人天）'])
+    ws.append([req_num, '项目', req_name, 1])
+    wb.save(path)
+
+def build(root: str, requirements: int = 100, rows: int = 50, error_rate: float = 0.1, extra_sheets: int = 0,
+          sheet_name: str = 'Sheet1', seed: int = 0) -> GeneratedData:
+    '''
+    Generate a result summary and one folder per requirement under root
+    Requirements cycle through cosmic (是), non-cosmic (否) and mixed (混合型) types.
+    Some rows are made wrong on purpose (CFP against fill colour, summary CFP or name), by error_rate
+
+    :param root: output folder, created if it does not exist
+    :param requirements: number of requirements
+    :param rows: number of sub-process rows in each cosmic file
+    :param error_rate: share of requirements with a mistake, default to 0.1
+    :param extra_sheets: number of unrelated worksheets in each cosmic file
+    :param sheet_name: worksheet name in the result summary
+    :param seed: random seed
+    :return: GeneratedData
+    '''
+
+    rng = random.Random(seed)
+    folders_path = os.path.join(root, 'folders')
+    cosmic_paths : list[str] = []
+    noncosmic_paths : list[str] = []
+
+    summary = openpyxl.Workbook()
+    ws = summary.active
+    ws.title = sheet_name
+    for _ in range(RS_SKIP_ROWS):
+        ws.append(['结果反馈'])
+    ws.append([RS_REQ_NUM, RS_REQ_NAME, RS_WORKLOAD_NAME, RS_TOTAL_CFP_NAME, RS_QLF_COSMIC])
+
+    for req_num in range(1, requirements + 1):
+        req_name = f'需求名称{req_num}'
+        subfolder = os.path.join(folders_path, str(req_num), SR_SUBFOLDER_NAME)
+        os.makedirs(subfolder, exist_ok=True)
+
+        qualified = ['是', '否', '混合型'][req_num % 3]
+        error = rng.random() < error_rate
+
+        total = 0.0
+        if qualified in ('是', '混合型'):
+            path = os.path.join(subfolder, f'{SR_COSMIC_FILE_PREFIX}：COSMIC评估{req_num}.xlsx')
+            total = write_cosmic(path=path, req_num=req_num, req_name=req_name, rows=rows, rng=rng,
+                                 error=error, extra_sheets=extra_sheets)
+            cosmic_paths.append(path)
+
+        if qualified in ('否', '混合型'):
+            path = os.path.join(subfolder, f'{SR_NONCOSMIC_FILE_PREFIX}：非COSMIC评估{req_num}.xlsx')
+            write_noncosmic(path=path, req_num=req_num, req_name=req_name)
+            noncosmic_paths.append(path)
+
+        summary_name = req_name + '（修订）' if error and rng.random() < 0.5 else req_name
+        ws.append([req_num, summary_name, int(total * Workload_CFP_Ratio), round(total), qualified])
+
+    summary_path = os.path.join(root, 'summary.xlsx')
+    summary.save(summary_path)
+
+    return GeneratedData(summary_path=summary_path, sheet_name=sheet_name, folders_path=folders_path,
+                         cosmic_paths=cosmic_paths, noncosmic_paths=noncosmic_paths)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic COSMIC requirement data')
+    parser.add_argument('root', help='output folder')
+    parser.add_argument('-n', '--requirements', type=int, default=100, help='number of requirements')
+    parser.add_argument('-r', '--rows', type=int, default=50, help='sub-process rows in each cosmic file')
+    parser.add_argument('--error-rate', type=float, default=0.1, help='share of requirements with a mistake')
+    parser.add_argument('--extra-sheets', type=int, default=0, help='unrelated worksheets in each cosmic file')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    data = build(root=args.root, requirements=args.requirements, rows=args.rows, error_rate=args.error_rate,
+                 extra_sheets=args.extra_sheets, seed=args.seed)
+    print(f'{data.summary_path} ({data.sheet_name}), {len(data.cosmic_paths)} cosmic and '
+          f'{len(data.noncosmic_paths)} non-cosmic files under {data.folders_path}')
@@ -0,0 +1,199 @@
+# Time the main operations of cosmicexcelchecker on generated data
+# Usage: python -m benchmarks.run [-n REQUIREMENTS] [-r ROWS] [--repeat K] [--json OUT]
+
+from cosmicexcelchecker.cosmic import CosmicReqExcel, ResultSummary
+from cosmicexcelchecker.find import FindExcels
+from cosmicexcelchecker.obf import CheckObf
+from cosmicexcelchecker.conf import RS_REQ_NUM
+from benchmarks.generate import build, GeneratedData
+
+from tabulate import tabulate
+from typing import Callable, NamedTuple, Union
+
+import argparse
+import json
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+
+class BenchResult(NamedTuple):
+    '''
+    Timing of a single benchmark
+    items is the number of units (files, requirements, pairs) processed by one run
+    '''
+
+    name: str
+    items: int
+    runs: int
+    min_s: float
+    mean_s: float
+    max_s: float
+    items_per_s: float
+    peak_mib: float
+
+def bench(name: str, func: Callable[[], object], items: int, repeat: int = 5,
+          setup: Union[Callable[[], object], None] = None, memory: bool = True) -> BenchResult:
+    '''
+    Run func repeat times and measure wall time, then once more under tracemalloc for the peak memory
+
+    :param name: name of the benchmark
+    :param func: function without arguments to time
+    :param items: number of units processed by one call of func
+    :param repeat: number of timed runs
+    :param setup: function called before every run, not timed
+    :param memory: bool for whether measuring peak memory (Python allocations only)
+    :return: BenchResult
+    '''
+
+    times : list[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    peak_mib = float('nan')
+    if memory:
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        try:
+            func()
+            peak_mib = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+
+    mean = sum(times) / len(times)
+
+    return BenchResult(name=name, items=items, runs=repeat, min_s=min(times), mean_s=mean, max_s=max(times),
+                       items_per_s=items / min(times) if min(times) > 0 else float('inf'), peak_mib=peak_mib)
+
+ALPHABET : str = string.ascii_letters + '需求名称功能子过程'
+
+def random_strings(count: int, length: int, seed: int = 0) -> list[str]:
+    # random strings of length // 2 to length characters
+    rng = random.Random(seed)
+    return [''.join(rng.choice(ALPHABET) for _ in range(rng.randint(length // 2, length))) for _ in range(count)]
+
+def mutate_strings(strings: list[str], max_edits: int = 3, seed: int = 0) -> list[str]:
+    # a typo-style copy of every string (substituted, inserted, deleted or swapped characters),
+    # so the pairs are similar strings as compared by CheckObf
+    rng = random.Random(seed)
+    mutated : list[str] = []
+    for s in strings:
+        chars = list(s)
+        for _ in range(rng.randint(1, max_edits)):
+            edit = rng.randrange(4)
+            i = rng.randrange(len(chars) + 1) if edit == 1 else rng.randrange(max(len(chars), 1))
+            if edit == 1:
+                chars.insert(i, rng.choice(ALPHABET))
+            elif not chars:
+                continue
+            elif edit == 0:
+                chars[i] = rng.choice(ALPHABET)
+            elif edit == 2:
+                del chars[i]
+            elif i + 1 < len(chars):
+                chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        mutated.append(''.join(chars))
+    return mutated
+
+def run(data: GeneratedData, repeat: int = 5, compare_pairs: int = 1000, compare_length: int = 64,
+        memory: bool = True) -> list[BenchResult]:
+    '''
+    Run all benchmarks on generated data
+
+    :param data: output of `benchmarks.generate.build`
+    :param repeat: number of timed runs of each benchmark
+    :param compare_pairs: number of string pairs for CheckObf.compare
+    :param compare_length: max length of the compared strings
+    :param memory: bool for whether measuring peak memory
+    :return: list of BenchResult
+    '''
+
+    results : list[BenchResult] = []
+
+    def add(name: str, func: Callable[[], object], items: int, setup: Union[Callable[[], object], None] = None):
+        results.append(bench(name=name, func=func, items=items, repeat=repeat, setup=setup, memory=memory))
+        print(f'{name}: {results[-1].min_s:.4f}s', flush=True)
+
+    n_files = len(data.cosmic_paths) + len(data.noncosmic_paths)
+    add('FindExcels.find_excels', lambda: FindExcels.find_excels(path=data.folders_path), n_files)
+
+    def load_all(load_highlight: bool, selective: bool) -> list[CosmicReqExcel]:
+        excels = [CosmicReqExcel(path=path) for path in data.cosmic_paths]
+        for excel in excels:
+            excel.load_excel(load_highlight=load_highlight, selective=selective)
+        return excels
+
+    n_cosmic = len(data.cosmic_paths)
+    add('CosmicReqExcel.load_excel', lambda: load_all(load_highlight=False, selective=False), n_cosmic)
+    add('CosmicReqExcel.load_excel(selective)', lambda: load_all(load_highlight=False, selective=True), n_cosmic)
+    add('CosmicReqExcel.load_excel(selective, highlight)', lambda: load_all(load_highlight=True, selective=True),
+        n_cosmic)
+
+    loaded = load_all(load_highlight=True, selective=True)
+
+    def reset_cfp_summary():
+        for excel in loaded:
+            excel._cfp_summary = None
+
+    add('CosmicReqExcel.get_CFP_total', lambda: [excel.get_CFP_total() for excel in loaded], n_cosmic,
+        setup=reset_cfp_summary)
+    add('CosmicReqExcel.check_highlight_cfp', lambda: [excel.check_highlight_cfp() for excel in loaded], n_cosmic)
+
+    def reset_fills():
+        for excel in loaded:
+            excel.cfp_fills = None
+
+    add('CosmicReqExcel.check_highlight_cfp(reopen)', lambda: [excel.check_highlight_cfp() for excel in loaded],
+        n_cosmic, setup=reset_fills)
+
+    result_summary = ResultSummary(path=data.summary_path, folders_path=data.folders_path, sheet_name=data.sheet_name)
+    result_summary.load_excel(selective=True)
+    result_summary.discover()
+    req_nums = result_summary.data_frame_specific[RS_REQ_NUM].tolist()
+
+    add('ResultSummary.check_file', lambda: [result_summary.check_file(req_num=req_num) for req_num in req_nums],
+        len(req_nums))
+    add('ResultSummary.check_all_files', result_summary.check_all_files, len(req_nums))
+    add('ResultSummary.check_all_files(no highlight)',
+        lambda: result_summary.check_all_files(check_highlight_cfp=False), len(req_nums))
+
+    strings1 = random_strings(count=compare_pairs, length=compare_length, seed=1)
+    strings2 = mutate_strings(strings=strings1, seed=2)
+    add('CheckObf.compare', lambda: [CheckObf.compare(s1, s2) for s1, s2 in zip(strings1, strings2)], compare_pairs)
+
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark cosmicexcelchecker on generated data')
+    parser.add_argument('-n', '--requirements', type=int, default=100, help='number of requirements')
+    parser.add_argument('-r', '--rows', type=int, default=50, help='sub-process rows in each cosmic file')
+    parser.add_argument('--extra-sheets', type=int, default=0, help='unrelated worksheets in each cosmic file')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs of each benchmark')
+    parser.add_argument('--compare-pairs', type=int, default=1000, help='string pairs for CheckObf.compare')
+    parser.add_argument('--compare-length', type=int, default=64, help='max length of compared strings')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--data', default=None, help='folder for the generated data, default to a temporary one')
+    parser.add_argument('--json', default=None, help='write results to a JSON file for later comparison')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='cosmic_bench_') as tmp_dir:
+        data = build(root=args.data or tmp_dir, requirements=args.requirements, rows=args.rows,
+                     extra_sheets=args.extra_sheets)
+
+        bench_results = run(data=data, repeat=args.repeat, compare_pairs=args.compare_pairs,
+                            compare_length=args.compare_length, memory=not args.no_memory)
+
+    print()
+    print(tabulate([r._asdict().values() for r in bench_results],
+                   headers=['benchmark', 'items', 'runs', 'min (s)', 'mean (s)', 'max (s)', 'items/s', 'peak (MiB)'],
+                   floatfmt='.4f'))
+
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': [r._asdict() for r in bench_results]}, f, indent=2)
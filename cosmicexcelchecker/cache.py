@@ -0,0 +1,253 @@
+# On-disk and in-memory caches for parsed requirement Excel files
+
+from typing import Union, Callable, Any
+from collections import OrderedDict
+
+import os
+import pickle
+import hashlib
+import tempfile
+
+# puts between two scans of the cache directory, to count entries written by other processes
+EVICT_SCAN_INTERVAL : int = 256
+# share of max_bytes kept by an eviction, so the next puts do not go over the limit again right away
+EVICT_TARGET_RATIO : float = 0.9
+
+class ParseCache:
+    '''
+    Keep parsed requirement Excel files (dataframes and fill colours) on local disk
+    Entries are keyed by path, size, mtime and content hash of the file, so a changed file is always parsed again.
+    Least recently used entries are removed once the cache directory is larger than max_bytes.
+    The size of the directory is kept as a running total, it is only scanned again when the total goes over
+    max_bytes or every EVICT_SCAN_INTERVAL puts
+    '''
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 ** 3):
+        '''
+        :param cache_dir: directory to store the cache, created if it does not exist
+        :param max_bytes: size limit of the cache directory in bytes, default to 1 GiB
+        '''
+
+        self.cache_dir : str = cache_dir
+        self.max_bytes : int = max_bytes
+
+        self._total_bytes : Union[int, None] = None  # unknown until the directory is scanned
+        self._puts_since_scan : int = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(path: str, variant: str = '', content: Union[bytes, None] = None) -> str:
+        '''
+        Fingerprint of a file by path, size, mtime and content hash
+
+        :param path: path to the file
+        :param variant: extra string to tell apart different ways of parsing the same file
+        :param content: raw bytes of the file if already read, hashed instead of reading the file again
+        :return: hex digest as string
+        '''
+
+        stat = os.stat(path)
+
+        if content is not None:
+            content_hash = hashlib.sha1(content)
+        else:
+            content_hash = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    content_hash.update(chunk)
+
+        key = f'{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{content_hash.hexdigest()}|{variant}'
+
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def get(self, path: str, variant: str = '', content: Union[bytes, None] = None,
+            key: Union[str, None] = None) -> Union[dict, None]:
+        '''
+        Get the cached data of a file
+
+        :param path: path to the file
+        :param variant: extra string to tell apart different ways of parsing the same file
+        :param content: raw bytes of the file if already read, see `fingerprint`
+        :param key: result of `fingerprint` if already computed, then path, variant and content are not used
+        :return: the cached dict or None if not cached (or the file changed)
+        '''
+
+        if key is None:
+            key = ParseCache.fingerprint(path=path, variant=variant, content=content)
+        entry_path = self._entry_path(key)
+
+        try:
+            with open(entry_path, 'rb') as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):  # corrupted entry
+            self._remove(entry_path)
+            return None
+
+        try:
+            os.utime(entry_path)  # mark as recently used
+        except OSError:
+            pass
+
+        return data
+
+    def put(self, path: str, data: dict, variant: str = '', content: Union[bytes, None] = None,
+            key: Union[str, None] = None) -> None:
+        '''
+        Store the parsed data of a file, then remove least recently used entries if the cache is too large
+
+        :param path: path to the file
+        :param data: picklable dict to store
+        :param variant: extra string to tell apart different ways of parsing the same file
+        :param content: raw bytes of the file if already read, see `fingerprint`
+        :param key: result of `fingerprint` if already computed, then path, variant and content are not used
+        :return: None
+        '''
+
+        if key is None:
+            key = ParseCache.fingerprint(path=path, variant=variant, content=content)
+        entry_path = self._entry_path(key)
+
+        try:
+            replaced_size = os.stat(entry_path).st_size
+        except FileNotFoundError:
+            replaced_size = 0
+
+        # write to a temporary file first, so other processes never read a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            os.replace(tmp_path, entry_path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        self._puts_since_scan += 1
+        if self._total_bytes is not None:
+            self._total_bytes += size - replaced_size
+
+        if (self._total_bytes is None or self._total_bytes > self.max_bytes
+                or self._puts_since_scan >= EVICT_SCAN_INTERVAL):
+            self.evict()
+
+    def evict(self) -> None:
+        '''
+        Remove least recently used entries if the cache directory is larger than max_bytes,
+        until it is not larger than EVICT_TARGET_RATIO of max_bytes
+
+        :return: None
+        '''
+
+        entries : list[tuple[int, int, str]] = []  # (mtime, size, path)
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.pkl'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # removed by another process
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total > self.max_bytes:
+            target = int(self.max_bytes * EVICT_TARGET_RATIO)
+            entries.sort()
+            for _, size, entry_path in entries:
+                if total <= target:
+                    break
+                self._remove(entry_path)
+                total -= size
+
+        self._total_bytes = total
+        self._puts_since_scan = 0
+
+    def clear(self) -> None:
+        '''
+        Remove all entries of the cache
+
+        :return: None
+        '''
+
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(('.pkl', '.tmp')):
+                    self._remove(entry.path)
+
+        self._total_bytes = 0
+        self._puts_since_scan = 0
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class WorkbookCache:
+    '''
+    Keep loaded requirement Excel objects in memory, shared by several ResultSummary in the same process
+    Entries are keyed by path, size and mtime of the file and the way it is loaded, so a changed file is loaded again.
+    Least recently used entries are dropped once there are more than max_entries
+    '''
+
+    def __init__(self, max_entries: Union[int, None] = 64):
+        '''
+        :param max_entries: number of loaded files to keep, default to 64. None means no limit
+        '''
+
+        self.max_entries : Union[int, None] = max_entries
+        self.hits : int = 0
+        self.misses : int = 0
+
+        self._entries : OrderedDict = OrderedDict()
+
+    def get_or_load(self, path: str, loader: Callable[[], Any], variant: str = '') -> Any:
+        '''
+        Get the loaded object of a file, call loader to load it if not cached (or the file changed)
+        Nothing is cached if loader raises
+
+        :param path: path to the file
+        :param loader: function without arguments returning the loaded object
+        :param variant: extra string to tell apart different ways of loading the same file
+        :return: the loaded object
+        '''
+
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, variant)
+
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        loaded = loader()
+
+        self._entries[key] = loaded
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return loaded
+
+    def clear(self) -> None:
+        '''
+        Remove all entries of the cache
+
+        :return: None
+        '''
+
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
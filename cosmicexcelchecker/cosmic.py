@@ -1,25 +1,66 @@
 # Core COSMIC File
 
 from cosmicexcelchecker._baseclass import PdExcel
-from typing import Union, Dict, List
+from typing import Union, Dict, List, Callable, NamedTuple, Iterator, Tuple
 from cosmicexcelchecker.errors import CosmicExcelCheckerException ,IncorrectFileTypeException, RepeatedREQNumException, \
     SheetNotFoundException, UnknownREQNumException
 from tabulate import tabulate
 from cosmicexcelchecker.conf import CFP_SHEET_NAMES ,CFP_COLUMN_NAME, SUB_PROCESS_NAME, RS_SKIP_ROWS, RS_TOTAL_CFP_NAME, \
     RS_WORKLOAD_NAME, RS_REQ_NUM, RS_REQ_NAME, SR_COSMIC_REQ_NAME,  SR_NONCOSMIC_REQ_NAME, SR_SUBFOLDER_NAME, \
-    SR_COSMIC_FILE_PREFIX, SR_NONCOSMIC_FILE_PREFIX, RS_QLF_COSMIC, COEFFICIENT_SHEET_NAME, \
+    SR_COSMIC_FILE_PREFIX, RS_QLF_COSMIC, COEFFICIENT_SHEET_NAME, \
     COEFFICIENT_SHEET_DATA_COL_NAME, NONCFP_SHEET_NAMES, SR_NONCOSMIC_PROJECT_NAME, SR_NONCOSMIC_REQ_NUM, \
-    SR_AC_REPORT_NUM, SR_AC_FINAL_NUM, SR_FINAL_CONFIRMATION, SR_AC_REQ_NUM, SR_AC_REQ_NAME, SR_AC_FINAL_NUM_LIMIT
+    SR_AC_REPORT_NUM, SR_AC_FINAL_NUM, SR_FINAL_CONFIRMATION, SR_AC_REQ_NUM, SR_AC_REQ_NAME, SR_AC_FINAL_NUM_LIMIT, \
+    Workload_CFP_Ratio
 
-from .find import FindExcels
+from .find import FindExcels, ReqFile, FileIndex
+from .cache import ParseCache, WorkbookCache
+from .obf import CheckObf
+from .timing import StageTimer, NullTimer, NULL_TIMER, summarize_stages
+from .memory import MemoryMonitor
+from .result import CheckResult, Issue, IssueKind, HighlightKind, highlight_messages
+from .xlsx import FILL_SKIPPED, FILL_NONE, FILL_YELLOW, FILL_RED, FILL_OTHER, color_code, read_column_fills
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from collections import deque
 
 import pandas as pd
+import io
 import numpy as np
 import time
+import os
+import pickle
+import hashlib
+import gc
+import json
+import csv
 import re
-import math
 import xlrd
 import openpyxl
+from array import array
+
+class CFPSummary(NamedTuple):
+    '''
+    CFP related values of a CFP sheet, computed once by `CosmicReqExcel.get_CFP_summary`
+    total is the sum of numeric CFP minus the rows with CFP but no sub-process
+    cfp_values is the CFP column converted to numeric (NaN if not a number)
+    '''
+
+    total: float
+    sub_process_null_count: int
+    cfp_missing: bool
+    sub_process_missing: bool
+    cfp_values: pd.Series
+
+class ReqRow(NamedTuple):
+    '''
+    Values of a requirement row in the result summary sheet used by `ResultSummary.check_file`
+    Built once per sheet, so a check does not search the sheet or look up columns again
+    '''
+
+    req_num: object
+    req_name: object
+    total_cfp: object
+    qualified_cosmic: object
 
 class CosmicReqExcel(PdExcel):
     '''
@@ -38,17 +79,129 @@ class CosmicReqExcel(PdExcel):
         self.data_frames: Union[Dict[str, pd.DataFrame], None] = None
         self.log : Union[List[str], str, None] = None
         self.file_format : Union[str, None] = None
+        self.cfp_fills : Union[array, None] = None  # sub-process fill colour code (FILL_*) of each CFP row
+        self._cfp_summary : Union[CFPSummary, None] = None  # cache of `get_CFP_summary`
+
+    def load_excel(self, load_highlight: bool = True, selective: bool = False,
+                   parse_cache: Union[ParseCache, None] = None, timer: Union[StageTimer, NullTimer] = NULL_TIMER,
+                   fill_engine: str = 'openpyxl', content: Union[bytes, None] = None):
+        '''
+        Load all spreadsheets from the Excel file. The workbook is opened only once and shared between pandas
+        and the fill colour extraction of the sub-process column (used by `check_highlight_cfp`)
+
+        :param load_highlight: bool for whether reading sub-process fill colours in the same pass, default to True
+        :param selective: bool for whether only loading sheets and columns used by the checks, default to False.
+        Other sheets can still be loaded later with `load_sheet`
+        :param parse_cache: an on-disk ParseCache, unchanged files are loaded from it instead of being parsed
+        :param timer: a StageTimer to record the 'cache', 'open', 'parse' and 'fills' stages, default to no timing
+        :param fill_engine: 'openpyxl' (default) or 'xml' to read fill colours of .xlsx files straight from
+        the worksheet XML, which is much faster for large sheets
+        :param content: raw bytes of the file if they were already read (e.g. prefetched), parsed from memory
+        instead of reading the file again. Default to None (read from path)
+        :return: None
+        '''
+
+        if fill_engine not in ('openpyxl', 'xml'):
+            raise ValueError(f"fill_engine has to be 'openpyxl' or 'xml', not {fill_engine!r}")
 
-    def load_excel(self):
         file_ext = self.path[self.path.rindex('.'):]
 
+        if file_ext in ('.xlsx', '.xls') and parse_cache is not None:
+            variant = repr(('cosmic', 'fill-codes', load_highlight, selective, CFP_SHEET_NAMES, CFP_COLUMN_NAME, SUB_PROCESS_NAME,
+                            SR_COSMIC_REQ_NAME, COEFFICIENT_SHEET_NAME, COEFFICIENT_SHEET_DATA_COL_NAME,
+                            SR_FINAL_CONFIRMATION))
+            with timer.stage('cache'):
+                key = ParseCache.fingerprint(path=self.path, variant=variant, content=content)
+                cached = parse_cache.get(path=self.path, key=key)
+
+            if cached is None:
+                self.load_excel(load_highlight=load_highlight, selective=selective, timer=timer,
+                                fill_engine=fill_engine, content=content)
+                with timer.stage('cache'):
+                    parse_cache.put(path=self.path, key=key, data={
+                        'data_frames': self.data_frames, 'cfp_fills': self.cfp_fills, 'file_format': self.file_format
+                    })
+            else:
+                self.data_frames = cached['data_frames']
+                self.cfp_fills = cached['cfp_fills']
+                self.file_format = cached['file_format']
+                self._cfp_summary = None
+
+            return
+
         # it can be simplified to a dict[file_ext:engine] but with less readability
-        if file_ext in ('.xlsx', '.xls'):
-            self.data_frames = pd.read_excel(self.path, sheet_name=None)
+        with timer.stage('open'):
+            if file_ext == '.xlsx':
+                book = openpyxl.load_workbook(self.path if content is None else io.BytesIO(content),
+                                              read_only=True, data_only=True, keep_links=False)
+                excel_file = pd.ExcelFile(book, engine='openpyxl')
+            elif file_ext == '.xls':
+                book = xlrd.open_workbook(self.path if content is None else None, file_contents=content,
+                                          formatting_info=load_highlight, on_demand=selective)
+                excel_file = pd.ExcelFile(book, engine='xlrd')
+            else:
+                raise IncorrectFileTypeException(f"{self.path} is not a valid relative file path for an Excel file")
+
+        try:
+            with timer.stage('parse'):
+                if selective:
+                    self.data_frames = _parse_selected(excel_file=excel_file, sheets=CosmicReqExcel.selected_sheets())
+                else:
+                    self.data_frames = excel_file.parse(sheet_name=None)
 
             self.file_format = file_ext
-        else:
-            raise IncorrectFileTypeException(f"{self.path} is not a valid relative file path for an Excel file")
+            with timer.stage('fills'):
+                if not load_highlight:
+                    self.cfp_fills = None
+                elif fill_engine == 'xml' and file_ext == '.xlsx':
+                    self.cfp_fills = self._extract_cfp_fills(book=None, content=content)
+                else:
+                    self.cfp_fills = self._extract_cfp_fills(book=book)
+            self._cfp_summary = None
+        finally:
+            excel_file.close()  # also closes the shared workbook
+
+    @staticmethod
+    def selected_sheets() -> Dict[str, Union[Callable[[str], bool], None]]:
+        '''
+        Sheets and columns used by the checks, loaded by `load_excel(selective=True)`
+
+        :return: dict of {sheet name: usecols}, usecols is None for all columns
+        '''
+
+        sheets : dict = {
+            sheet_name: lambda col: col in (CFP_COLUMN_NAME, SUB_PROCESS_NAME) or str(col).startswith(SR_COSMIC_REQ_NAME)
+            for sheet_name in CFP_SHEET_NAMES
+        }
+        sheets[COEFFICIENT_SHEET_NAME] = lambda col: col == COEFFICIENT_SHEET_DATA_COL_NAME
+        sheets.update({sheet_name: None for sheet_name in SR_FINAL_CONFIRMATION})  # header is in second row
+
+        return sheets
+
+    def release(self) -> None:
+        '''
+        Drop the loaded dataframes and fill colours, so their memory is freed as soon as the checks finish
+        Call `load_excel` again to use this instance afterwards
+
+        :return: None
+        '''
+
+        self.data_frames = None
+        self.cfp_fills = None
+        self._cfp_summary = None
+
+    def load_sheet(self, sheet_name: str) -> pd.DataFrame:
+        '''
+        Load (or reload with all columns) a single worksheet on demand, e.g. after `load_excel(selective=True)`
+
+        :param sheet_name: name of the worksheet
+        :return: the loaded pd.DataFrame
+        '''
+
+        self.data_frames = _load_sheet(path=self.path, sheet_name=sheet_name, data_frames=self.data_frames)
+        self._cfp_summary = None
+
+        return self.data_frames[sheet_name]
 
     def print_df(self):
         '''
@@ -86,13 +239,18 @@ class CosmicReqExcel(PdExcel):
         return None
 
 
-    def get_CFP_total(self) -> Union[float, None]:
+    def get_CFP_summary(self) -> Union[CFPSummary, None]:
         '''
-        get total CFP pts under CFP column
-        it will convert all possible numeric values to dtype float (or int) and leave others as NaN
+        Compute the CFP related values of the CFP sheet in a single vectorized pass
+        The result is cached and shared by `get_CFP_total`, `check_CFP_column` and `check_coefficient_sheet`,
+        and it is reset by `load_excel` and `load_sheet`
 
-        :return: total CFP pts
+        :return: a CFPSummary or None if CFP sheet, CFP column or sub-process column does not exist
         '''
+
+        if self._cfp_summary is not None:
+            return self._cfp_summary
+
         data : Union[pd.DataFrame, None] = None
         for sheet_name in CFP_SHEET_NAMES:  # iterate through
             data = self.data_frames.get(sheet_name, None) if isinstance(self.data_frames, dict) else None
@@ -104,14 +262,33 @@ class CosmicReqExcel(PdExcel):
             return None
 
         cfp_s : pd.Series = pd.to_numeric(data.loc[:, CFP_COLUMN_NAME], errors='coerce')  # convert to numeric
-        cfp_df : pd.DataFrame = data.loc[:, [SUB_PROCESS_NAME, CFP_COLUMN_NAME]]
+        cfp_null : np.ndarray = data.loc[:, CFP_COLUMN_NAME].isna().to_numpy()
+        sub_process_null : np.ndarray = data.loc[:, SUB_PROCESS_NAME].isna().to_numpy()
+
+        # only when subprocess is null, not both null
+        sub_process_null_count = int(np.count_nonzero(sub_process_null & ~cfp_null))
 
-        sub_process_null_count = 0  # only when subprocess is null, not both null
-        for index, row in cfp_df.iterrows():
-            if pd.isna(row[SUB_PROCESS_NAME]) and not pd.isna(row[CFP_COLUMN_NAME]):
-                sub_process_null_count += 1
+        self._cfp_summary = CFPSummary(
+            total=cfp_s.sum() - sub_process_null_count,
+            sub_process_null_count=sub_process_null_count,
+            cfp_missing=bool(cfp_null.any()),
+            sub_process_missing=bool(sub_process_null.any()),
+            cfp_values=cfp_s
+        )
 
-        return cfp_s.sum() - sub_process_null_count
+        return self._cfp_summary
+
+    def get_CFP_total(self) -> Union[float, None]:
+        '''
+        get total CFP pts under CFP column
+        it will convert all possible numeric values to dtype float (or int) and leave others as NaN
+
+        :return: total CFP pts
+        '''
+
+        cfp_summary = self.get_CFP_summary()
+
+        return cfp_summary.total if cfp_summary is not None else None
 
     def check_CFP_column(self) -> dict:
         '''
@@ -121,33 +298,22 @@ class CosmicReqExcel(PdExcel):
         :return: a dict-format result
         '''
 
-        for sheet_name in CFP_SHEET_NAMES:  # iterate through
-            cfp_df : Union[pd.DataFrame, None] = self.data_frames.get(sheet_name, None) if isinstance(self.data_frames, dict) else None
-
-            if cfp_df is not None:
-                break
+        cfp_summary = self.get_CFP_summary()
 
-        if cfp_df is None or CFP_COLUMN_NAME not in cfp_df or SUB_PROCESS_NAME not in cfp_df:  # noqa
+        if cfp_summary is None:
             return {'path': self.path, 'match': False, 'CFP': -1, 'note': 'No CFP related column'}
 
-        cfp_df : pd.DataFrame = cfp_df.loc[:, [SUB_PROCESS_NAME, CFP_COLUMN_NAME]]  # noqa
-        cfp_total = self.get_CFP_total()  # it will always return a float since CFP column exists
-
         # record if cfp or sub-process column miss anything
-        note = f"Missing data in {'CFP Column' * int(cfp_df.loc[:, CFP_COLUMN_NAME].isna().sum() > 0)} " \
-               f"{'Subprocess description' * int(cfp_df.loc[:, SUB_PROCESS_NAME].isna().sum() > 0)}".strip()
-        # if cfp_df.loc[:, CFP_COLUMN_NAME].isna().sum() > 0:  # blank space or non-numeric char
-        #     note = 'Missing data in CFP Column'
-        #
-        # if cfp_df.loc[:, SUB_PROCESS_NAME].isna().sum() > 0:
-        #     note +=
+        note = f"Missing data in {'CFP Column' * int(cfp_summary.cfp_missing)} " \
+               f"{'Subprocess description' * int(cfp_summary.sub_process_missing)}".strip()
+
         if note == 'Missing data in':  # meaning there's no missing
             note = ''
 
         return {
             "path": self.path,
             "match": True,
-            "CFP": cfp_total,
+            "CFP": cfp_summary.total,
             "note": note
         }
 
@@ -197,8 +363,8 @@ class CosmicReqExcel(PdExcel):
             }
 
         # ignore first row, set index 1 as column and reset index.
-        fc_sheet.columns = fc_sheet.iloc[0]  # noqa
-        fc_sheet = fc_sheet.iloc[1:]
+        # set_axis returns a new frame, the loaded sheet is left as is so the check can run again
+        fc_sheet = fc_sheet.set_axis(fc_sheet.iloc[0], axis=1).iloc[1:]  # noqa
         fc_sheet = fc_sheet.reset_index(drop=True)
 
         # load other sheets for comparison
@@ -276,128 +442,182 @@ class CosmicReqExcel(PdExcel):
                 "note": "Key Error in worksheet. Make sure they are in standard format"
             }
 
-    def check_highlight_cfp(self) -> list[int, None]:
+    def _extract_cfp_fills(self, book: Union[openpyxl.Workbook, xlrd.Book, None],
+                           content: Union[bytes, None] = None) -> Union[array, None]:
         '''
-        check the highlight on sub-process and its corresponding cfp in the same line
-        No fill: 1 cfp; Yellow: 0 cfp; Red: 1/3 cfp
-
-        :return:
+        Read the fill colour of the sub-process cell for every row of the CFP sheet from an opened workbook.
+        Only the sub-process column of the CFP sheet is walked, row by row, and the fill of every cell style is
+        resolved against the stylesheet only once. Colours are stored as FILL_YELLOW, FILL_RED, FILL_NONE (no fill),
+        FILL_OTHER, or FILL_SKIPPED if the row is not counted
+
+        :param book: workbook opened by openpyxl (.xlsx, read-only) or xlrd with formatting_info (.xls).
+        None to read the XML of the .xlsx file directly (see `xlsx.read_column_fills`)
+        :param content: raw bytes of the .xlsx file to read instead of path when book is None
+        :return: array of colour codes in the same order as the rows of CFP dataframe, or None if not applicable
         '''
 
-        # load the Excel again using openpyxl/xlrd
-        if self.file_format == '.csv':
-            return list()
-        elif self.file_format == '.xlsx':
-            excel = openpyxl.load_workbook(self.path)
-
-            # open cfp sheet
-            sheet = None
-            cfp_df : Union[pd.DataFrame, None] = None
-            for sheet_name in CFP_SHEET_NAMES:
-                if sheet_name in excel:
-                    sheet = excel[sheet_name]
-                    cfp_df = self.data_frames.get(sheet_name, None) if \
-                        isinstance(self.data_frames, dict) else None
-                    break
-
-            if sheet is None or cfp_df is None:
-                raise SheetNotFoundException(f"Standard CFP Sheet not found")
-
-            # get subprocess index and cfp
-            sp_idx = cfp_df.columns.get_loc(SUB_PROCESS_NAME)  # subprocess col
-            cfp_idx = cfp_df.columns.get_loc(CFP_COLUMN_NAME)
-
-            err_list : list = []
-            row_num = 1  # 1-based, =1 since min_row = 2
-            # extract cell value and compare
-            for row in sheet.iter_rows(min_row=2, max_row=len(cfp_df.index) + 1, min_col=sp_idx + 1, max_col=sp_idx + 1):  # 1-based idx for min_row, each row is a tuple
-                row_num += 1
-                sp_color_hex : str = ""
-                cfp_cell : str = ""
-                # for i in range(len(row)):
-                #     if i == sp_idx and row[i].value != SUB_PROCESS_NAME:  # avoid first row
-                #         sp_color_hex : str = row[i].fill.start_color.index  # hex value for the cell fill color
-                #
-                #     if i == cfp_idx and row[i].value != CFP_COLUMN_NAME:
-                #         cfp_cell = str(row[i].value)
-                sp_color_hex : str = row[0].fill.start_color.index
-                cfp_cell = str(cfp_df.iloc[row_num - 2, cfp_idx])  # avoid str cell value
-
-                if sp_color_hex == "":  # not counted since subprocess is empty
-                    continue
+        for sheet_name in CFP_SHEET_NAMES:
+            cfp_df : Union[pd.DataFrame, None] = self.data_frames.get(sheet_name, None) if \
+                isinstance(self.data_frames, dict) else None
 
-                if cfp_cell == "":  # only count valid subprocess row
-                    err_list.append(f'{row_num} Missing Data')
-                    continue
-                try:
-                    cfp_cell : float = float(cfp_cell)
-                except ValueError:
-                    err_list.append(f'{row_num} CFP not a number')
-                    continue
+            if cfp_df is not None:
+                break
+
+        if cfp_df is None or SUB_PROCESS_NAME not in cfp_df.columns:  # noqa
+            return None
+
+        if book is None:
+            return read_column_fills(path=self.path if content is None else io.BytesIO(content), sheet_name=sheet_name, column_name=SUB_PROCESS_NAME,  # noqa
+                                     max_rows=len(cfp_df.index))
 
-                if sp_color_hex == 'FFFFFF00' and cfp_cell != 0:  # YELLOW
-                    err_list.append(f'{row_num} Yellow != 0')
-                elif sp_color_hex == 'FFFF0000' and abs(cfp_cell - 1/3) >= 0.01:  # RED
-                    err_list.append(f'{row_num} Red != 1/3 or 0.333')
-                elif (sp_color_hex == '00000000' or (type(sp_color_hex) is int and sp_color_hex == 9)) and cfp_cell != 1:  # No fill
-                    err_list.append(f'{row_num} No fill (White) != 1')
+        fills : array = array('b')
+        if isinstance(book, openpyxl.Workbook):
+            sheet = book[sheet_name]  # noqa
 
-        elif self.file_format == '.xls':
-            excel = xlrd.open_workbook(self.path, formatting_info=True)
+            # subprocess col in the worksheet, which differs from dataframe when only some columns are loaded
+            header = list(next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ()))
+            if SUB_PROCESS_NAME not in header:
+                return None
+            sp_idx = header.index(SUB_PROCESS_NAME)
 
-            # open cfp sheet
-            sheet = None
-            cfp_df: Union[pd.DataFrame, None] = None
-            for sheet_name in CFP_SHEET_NAMES:
-                if sheet_name in excel.sheet_names():
-                    sheet = excel.sheet_by_name(sheet_name)
-                    cfp_df = self.data_frames.get(sheet_name, None) if \
-                        isinstance(self.data_frames, dict) else None
-                    break
+            style_codes : Dict[int, int] = {}  # {cell style id: fill code}
+
+            # 1-based idx for min_row, each row is a tuple
+            for row in sheet.iter_rows(min_row=2, max_row=len(cfp_df.index) + 1, min_col=sp_idx + 1, max_col=sp_idx + 1):
+                cell = row[0] if len(row) > 0 else None
+                style_id = getattr(cell, '_style_id', None)  # EmptyCell has no style in read-only mode
+
+                if style_id is None:  # EmptyCell (no fill) or a cell of a workbook not in read-only mode
+                    fill = getattr(cell, 'fill', None)
+                    fills.append(color_code(fill.start_color.index if fill is not None else None))
+                    continue
+
+                code = style_codes.get(style_id)
+                if code is None:
+                    code = style_codes[style_id] = color_code(cell.fill.start_color.index)
+                fills.append(code)
+
+        else:
+            if not book.formatting_info:
+                return None
 
-            if sheet is None or cfp_df is None:
-                raise SheetNotFoundException(f"Standard CFP Sheet not found")
+            sheet = book.sheet_by_name(sheet_name)  # noqa
 
-            # get idx of subprocess and cfp col
-            sp_idx = cfp_df.columns.get_loc(SUB_PROCESS_NAME)  # subprocess col
-            cfp_idx = cfp_df.columns.get_loc(CFP_COLUMN_NAME)
+            header = sheet.row_values(0) if sheet.nrows > 0 else []
+            if SUB_PROCESS_NAME not in header:
+                return None
+            sp_idx = header.index(SUB_PROCESS_NAME)
+            rows = min(sheet.nrows, len(cfp_df.index) + 1)
 
-            err_list = []
-            rows = min(sheet.nrows, len(cfp_idx.index) + 1)
+            xf_codes : Dict[int, int] = {}  # {xf index: fill code}
 
             for i in range(1, rows):
-                sp_cell : xlrd.sheet.Cell = sheet.cell(rowx=i, colx=sp_idx)
-                # cfp_cell : xlrd.sheet.Cell = sheet.cell(rowx=i, colx=cfp_idx)
+                if str(sheet.cell(rowx=i, colx=sp_idx).value) == "":  # not count as valid if subprocess is empty
+                    fills.append(FILL_SKIPPED)
+                    continue
 
                 xfx = sheet.cell_xf_index(rowx=i, colx=sp_idx)  # xf index
-                xf = excel.xf_list[xfx]  # used xfx as index
-                bgx = xf.background.pattern_colour_index
+                code = xf_codes.get(xfx)
+                if code is None:
+                    bgx = book.xf_list[xfx].background.pattern_colour_index  # used xfx as index
+                    code = xf_codes[xfx] = {13: FILL_YELLOW, 10: FILL_RED, 64: FILL_NONE}.get(bgx, FILL_OTHER)
+                fills.append(code)
 
-                cfp : str = str(cfp_df.iloc[i - 1, cfp_idx])
-                if str(sp_cell.value) == "":  # not count as valid if subprocess is empty
-                    continue
+        return fills
 
-                if cfp == "":  # only count valid subprocess row
-                    err_list.append(f'{i + 1} Missing data')
-                    continue
+    def check_highlight_cfp(self, fill_engine: str = 'openpyxl') -> list[int, None]:
+        '''
+        check the highlight on sub-process and its corresponding cfp in the same line
+        No fill: 1 cfp; Yellow: 0 cfp; Red: 1/3 cfp
+        Fill colours are read by `load_excel`, the file is only opened again if they were not loaded
 
-                try:
-                    cfp : float = float(cfp)
-                except ValueError:
-                    err_list.append(f'{i + 1} CFP not a number')
-                    continue
+        :param fill_engine: 'openpyxl' (default) or 'xml', how fill colours are read if they were not loaded
+        :return: list of errors such as '5 Yellow != 0', see `get_highlight_errors` for the same as arrays
+        '''
 
-                if bgx == 13 and float(cfp) != 0:  # YELLOW
-                    err_list.append(f'{i + 1} Yellow != 0')
-                elif bgx == 10 and abs(float(cfp) - 1/3) >= 0.01:  # RED
-                    err_list.append(f'{i + 1} Red != 1/3 or 0.333')
-                elif bgx == 64 and float(cfp) != 1:  # no fill
-                    err_list.append(f'{i + 1} No fill (White) != 1')
+        rows, row_kinds = self.get_highlight_errors(fill_engine=fill_engine)
 
-        else:
+        return highlight_messages(rows=rows, row_kinds=row_kinds)
+
+    def get_highlight_errors(self, fill_engine: str = 'openpyxl') -> Tuple[array, array]:
+        '''
+        Same check as `check_highlight_cfp`, with the wrong rows kept in arrays instead of text
+
+        :param fill_engine: 'openpyxl' (default) or 'xml', how fill colours are read if they were not loaded
+        :return: (row numbers, HighlightKind of each row) as array('l') and array('b')
+        '''
+
+        rows : array = array('l')
+        row_kinds : array = array('b')
+
+        if self.file_format == '.csv':
+            return rows, row_kinds
+        elif self.file_format not in ('.xlsx', '.xls'):
             raise IncorrectFileTypeException(f"Incorrect file type {self.file_format}. It has to be .xlsx or .xls file (.csv deprecated)")
 
-        return err_list
+        # open cfp sheet
+        cfp_df : Union[pd.DataFrame, None] = None
+        for sheet_name in CFP_SHEET_NAMES:
+            cfp_df = self.data_frames.get(sheet_name, None) if isinstance(self.data_frames, dict) else None
+
+            if cfp_df is not None:
+                break
+
+        if cfp_df is None:
+            raise SheetNotFoundException(f"Standard CFP Sheet not found")
+
+        # get subprocess index and cfp
+        cfp_df.columns.get_loc(SUB_PROCESS_NAME)  # raise KeyError if subprocess col does not exist
+        cfp_idx = cfp_df.columns.get_loc(CFP_COLUMN_NAME)
+
+        fills = self.cfp_fills
+        if fills is None:  # not loaded with `load_excel`, load the Excel again using openpyxl/xlrd
+            if self.file_format == '.xlsx' and fill_engine == 'xml':
+                fills = self._extract_cfp_fills(book=None)
+            elif self.file_format == '.xlsx':
+                book = openpyxl.load_workbook(self.path, read_only=True, data_only=True, keep_links=False)
+                try:
+                    fills = self._extract_cfp_fills(book=book)
+                finally:
+                    book.close()
+            else:
+                book = xlrd.open_workbook(self.path, formatting_info=True)
+                try:
+                    fills = self._extract_cfp_fills(book=book)
+                finally:
+                    book.release_resources()
+
+            self.cfp_fills = fills
+
+        # compare colour and cfp, row_num is 1-based and starts from 2 since first row is header
+        for row_num, sp_color in enumerate(fills, start=2):
+            if sp_color == FILL_SKIPPED:  # not counted since subprocess is empty
+                continue
+
+            cfp_cell : str = str(cfp_df.iloc[row_num - 2, cfp_idx])  # avoid str cell value
+
+            if cfp_cell == "":  # only count valid subprocess row
+                rows.append(row_num)
+                row_kinds.append(HighlightKind.MISSING_DATA)
+                continue
+            try:
+                cfp_cell : float = float(cfp_cell)
+            except ValueError:
+                rows.append(row_num)
+                row_kinds.append(HighlightKind.CFP_NOT_A_NUMBER)
+                continue
+
+            if sp_color == FILL_YELLOW and cfp_cell != 0:  # YELLOW
+                rows.append(row_num)
+                row_kinds.append(HighlightKind.YELLOW_NOT_ZERO)
+            elif sp_color == FILL_RED and abs(cfp_cell - 1/3) >= 0.01:  # RED
+                rows.append(row_num)
+                row_kinds.append(HighlightKind.RED_NOT_ONE_THIRD)
+            elif sp_color == FILL_NONE and cfp_cell != 1:  # No fill
+                rows.append(row_num)
+                row_kinds.append(HighlightKind.NO_FILL_NOT_ONE)
+
+        return rows, row_kinds
 
 class NonCosmicReqExcel(PdExcel):
     '''
@@ -416,15 +636,82 @@ class NonCosmicReqExcel(PdExcel):
         self.data_frames: Union[Dict[str, pd.DataFrame], None] = None
         self.log: Union[List[str], str, None] = None
 
-    def load_excel(self):
+    def load_excel(self, selective: bool = False, parse_cache: Union[ParseCache, None] = None,
+                   timer: Union[StageTimer, NullTimer] = NULL_TIMER, content: Union[bytes, None] = None):
+        '''
+        Load all spreadsheets from the Excel file
+
+        :param selective: bool for whether only loading sheets and columns used by the checks, default to False.
+        Other sheets can still be loaded later with `load_sheet`
+        :param parse_cache: an on-disk ParseCache, unchanged files are loaded from it instead of being parsed
+        :param timer: a StageTimer to record the 'cache' and 'parse' stages, default to no timing
+        :param content: raw bytes of the file if they were already read (e.g. prefetched), parsed from memory
+        instead of reading the file again. Default to None (read from path)
+        :return: None
+        '''
+
         file_ext = self.path[self.path.rindex('.'):]
+        source = self.path if content is None else io.BytesIO(content)
 
         # it can be simplified to a dict[file_ext:engine] but with less readability
         if file_ext in ('.xlsx', '.xls'):
-            self.data_frames = pd.read_excel(self.path, sheet_name=None)
+            if parse_cache is not None:
+                variant = repr(('noncosmic', selective, NONCFP_SHEET_NAMES, SR_NONCOSMIC_REQ_NAME,
+                                SR_NONCOSMIC_PROJECT_NAME, SR_NONCOSMIC_REQ_NUM))
+                with timer.stage('cache'):
+                    key = ParseCache.fingerprint(path=self.path, variant=variant, content=content)
+                    cached = parse_cache.get(path=self.path, key=key)
+
+                if cached is None:
+                    self.load_excel(selective=selective, timer=timer, content=content)
+                    with timer.stage('cache'):
+                        parse_cache.put(path=self.path, key=key, data={'data_frames': self.data_frames})
+                else:
+                    self.data_frames = cached['data_frames']
+
+            elif selective:
+                with timer.stage('parse'), pd.ExcelFile(source) as excel_file:
+                    self.data_frames = _parse_selected(excel_file=excel_file, sheets=NonCosmicReqExcel.selected_sheets())
+            else:
+                with timer.stage('parse'):
+                    self.data_frames = pd.read_excel(source, sheet_name=None)
         else:
             raise IncorrectFileTypeException(f"{self.path} is not a valid relative file path for an Excel file")
 
+    @staticmethod
+    def selected_sheets() -> Dict[str, Union[Callable[[str], bool], None]]:
+        '''
+        Sheets and columns used by the checks, loaded by `load_excel(selective=True)`
+
+        :return: dict of {sheet name: usecols}, usecols is None for all columns
+        '''
+
+        return {
+            NONCFP_SHEET_NAMES: lambda col: col in (SR_NONCOSMIC_REQ_NAME, SR_NONCOSMIC_PROJECT_NAME, SR_NONCOSMIC_REQ_NUM)
+        }
+
+    def release(self) -> None:
+        '''
+        Drop the loaded dataframes, so their memory is freed as soon as the checks finish
+        Call `load_excel` again to use this instance afterwards
+
+        :return: None
+        '''
+
+        self.data_frames = None
+
+    def load_sheet(self, sheet_name: str) -> pd.DataFrame:
+        '''
+        Load (or reload with all columns) a single worksheet on demand, e.g. after `load_excel(selective=True)`
+
+        :param sheet_name: name of the worksheet
+        :return: the loaded pd.DataFrame
+        '''
+
+        self.data_frames = _load_sheet(path=self.path, sheet_name=sheet_name, data_frames=self.data_frames)
+
+        return self.data_frames[sheet_name]
+
     def print_df(self):
         '''
         Try to print the converted pd.Dataframe to the terminal
@@ -475,13 +762,30 @@ class ResultSummary(PdExcel):
     Demonstrated for loading and processing data in Result Summary related excels
     '''
 
-    def __init__(self, path: str, folders_path:str, sheet_name: str):
+    def __init__(self, path: str, folders_path:str, sheet_name: str, parse_cache: Union[ParseCache, None] = None,
+                 scan_workers: int = 1, index_path: Union[str, None] = None,
+                 file_paths: Union[list[str], None] = None, file_index: Union[FileIndex, None] = None,
+                 workbook_cache: Union[WorkbookCache, None] = None, fill_engine: str = 'openpyxl'):
         '''
         data_frames is the pd.DataFrame converted from Spreadsheet
         log holds temporary error/warning for later usage (e.g print to terminal)
+        Requirement files under folders_path are not searched until the first `check_file` (or `discover`),
+        so `check_ratio` and printing worksheets never walk the folders
 
         :param path: path of the result summary file
         :param sheet_name: specific worksheet name in result summary to be loaded
+        :param parse_cache: an on-disk ParseCache used when loading requirement files, default to None (no cache)
+        :param scan_workers: number of threads to walk folders_path, default to 1 (no thread pool)
+        :param index_path: JSON file of a persisted FileIndex of folders_path, only changed folders are walked again.
+        Default to None (walk the whole folders_path)
+        :param file_paths: precomputed list of requirement file paths under folders_path (e.g. `find_excels` output),
+        folders_path is not walked if given
+        :param file_index: a FileIndex of folders_path that can be shared by several ResultSummary,
+        refreshed on first use. index_path is ignored if given
+        :param workbook_cache: an in-memory WorkbookCache of loaded requirement files that can be shared by
+        several ResultSummary, default to None (load each file every time it is checked)
+        :param fill_engine: how sub-process fill colours of requirement files are read (see
+        `CosmicReqExcel.load_excel`), 'openpyxl' (default) or 'xml' for the faster XML reader of .xlsx files
         '''
         self.path : str = FindExcels.path_format(path=path)
         self.folders_path : str = FindExcels.path_format(path=folders_path)
@@ -489,14 +793,82 @@ class ResultSummary(PdExcel):
         self.data_frame_specific : Union[pd.DataFrame, None] = None
         self.log : Union[list[str], str, None] = None
         self.sheet_name : str = sheet_name
-        self.file_paths : Union[list[str, None], None] = FindExcels.find_excels(path=self.folders_path)
+        self.parse_cache : Union[ParseCache, None] = parse_cache
+        self.scan_workers : int = scan_workers
+        self.workbook_cache : Union[WorkbookCache, None] = workbook_cache
+
+        if fill_engine not in ('openpyxl', 'xml'):
+            raise ValueError(f"fill_engine has to be 'openpyxl' or 'xml', not {fill_engine!r}")
+        self.fill_engine : str = fill_engine
+        self.peak_memory : Union[int, None] = None  # peak RSS in bytes of the last memory-bounded run
+
+        if file_index is None and index_path is not None:
+            file_index = FileIndex(path=self.folders_path, index_path=index_path)
+        self.file_index : Union[FileIndex, None] = file_index
+
+        self._file_paths : Union[list[str, None], None] = None if file_paths is None else list(file_paths)
+        self._req_index : Union[Dict[str, List[ReqFile]], None] = None
+
+        # requirement rows of data_frame_specific, see `_index_rows`
+        self._indexed_frame : Union[pd.DataFrame, None] = None
+        self._indexed_shape : Union[tuple, None] = None
+        self._indexed_index : Union[pd.Index, None] = None
+        self._req_rows : Dict[object, ReqRow] = {}
+        self._req_num_counts : Dict[object, int] = {}
+        self._missing_columns : frozenset = frozenset()
+
+    @property
+    def file_paths(self) -> list[str, None]:
+        # requirement files under folders_path, searched on first access
+        if self._file_paths is None:
+            if self.file_index is not None:
+                self.file_index.refresh()
+                self._file_paths = self.file_index.file_paths
+            else:
+                self._file_paths = FindExcels.find_excels(path=self.folders_path, max_workers=self.scan_workers)
+        return self._file_paths
+
+    @file_paths.setter
+    def file_paths(self, file_paths: Union[list[str, None], None]) -> None:
+        # None means searching again on next access
+        self._file_paths = None if file_paths is None else list(file_paths)
+        self._req_index = None
+
+    @property
+    def req_index(self) -> Dict[str, List[ReqFile]]:
+        # requirement files keyed by requirement folder name, built on first access
+        if self._req_index is None:
+            self._req_index = FindExcels.index_excels(path=self.folders_path, file_paths=self.file_paths)
+        return self._req_index
+
+    def discover(self) -> None:
+        '''
+        Search the requirement files under folders_path now instead of on the first `check_file`
+
+        :return: None
+        '''
+
+        self.req_index
+
+    def load_excel(self, selective: bool = False):
+        '''
+        Load all spreadsheets from the Excel file
+
+        :param selective: bool for whether only loading the worksheet given by sheet_name, default to False.
+        Other sheets are loaded on demand by `set_sheet_name`
+        :return: None
+        '''
 
-    def load_excel(self):
         file_ext = self.path[self.path.rindex('.'):]
 
         # it can be simplified to a dict[file_ext:engine] but with less readability
         if file_ext in ('.xlsx', '.xls'):
-            self.data_frames = pd.read_excel(self.path, sheet_name=None, skiprows=range(RS_SKIP_ROWS))
+            if selective:
+                with pd.ExcelFile(self.path) as excel_file:
+                    self.data_frames = _parse_selected(excel_file=excel_file, sheets={self.sheet_name: None},
+                                                       skiprows=range(RS_SKIP_ROWS))
+            else:
+                self.data_frames = pd.read_excel(self.path, sheet_name=None, skiprows=range(RS_SKIP_ROWS))
 
             df_specific = self.data_frames.get(self.sheet_name, None)
 
@@ -504,12 +876,14 @@ class ResultSummary(PdExcel):
                 raise SheetNotFoundException(f"Sheet with name {self.sheet_name} is not found inside the given file")
 
             self.data_frame_specific = df_specific
+            self._index_rows()
         else:
             raise IncorrectFileTypeException(f"{self.path} is not a valid relative file path for an Excel file")
 
     def set_sheet_name(self, sheet_name: str):
         '''
         Setting worksheet name for reading dataframe later
+        The worksheet is loaded on demand if it was skipped by `load_excel(selective=True)`
 
         :param sheet_name: str, name of the worksheet
         :return: None
@@ -517,13 +891,72 @@ class ResultSummary(PdExcel):
 
         self.sheet_name = sheet_name
 
+        if isinstance(self.data_frames, dict) and self.sheet_name not in self.data_frames:
+            self.data_frames = _load_sheet(path=self.path, sheet_name=sheet_name, data_frames=self.data_frames,
+                                           skiprows=range(RS_SKIP_ROWS))
+
         df_specific = self.data_frames.get(self.sheet_name, None)
 
         if df_specific is None:
             raise SheetNotFoundException(f"Sheet with name {sheet_name} is not found inside the given file")
 
         self.data_frame_specific = df_specific
+        self._index_rows()
+
+    def _index_rows(self) -> None:
+        '''
+        Index the rows of data_frame_specific by requirement number in a single pass
+        Repeated requirement numbers are counted with `value_counts` and left out of the index.
+        Missing columns are recorded instead of raising, so sheets without them can still be loaded
+
+        :return: None
+        '''
+
+        df = self.data_frame_specific
+        columns = (RS_REQ_NUM, RS_REQ_NAME, RS_TOTAL_CFP_NAME, RS_QLF_COSMIC)
+
+        self._indexed_frame = df
+        self._indexed_shape = df.shape
+        self._indexed_index = df.index
+        self._missing_columns = frozenset(column for column in columns if column not in df.columns)
+
+        if RS_REQ_NUM in self._missing_columns:
+            self._req_num_counts = {}
+            self._req_rows = {}
+            return
+
+        self._req_num_counts = df[RS_REQ_NUM].value_counts(dropna=False).to_dict()
+
+        values = [df[column].tolist() if column not in self._missing_columns else [None] * len(df.index)
+                  for column in columns]
+        self._req_rows = {
+            row.req_num: row for row in map(ReqRow._make, zip(*values)) if self._req_num_counts.get(row.req_num) == 1
+        }
+
+    def _rows_stale(self) -> bool:
+        # data_frame_specific was replaced, or rows were added or dropped in place
+        df = self.data_frame_specific
+        return df is not self._indexed_frame or df.shape != self._indexed_shape or df.index is not self._indexed_index
+
+    def reindex_rows(self) -> None:
+        '''
+        Index the rows of data_frame_specific again
+        Replacing data_frame_specific or adding and dropping its rows is noticed by `check_file`, but values
+        edited in place (e.g. `rs.data_frame_specific.loc[0, 'REQ Num'] = ...`) are not, call this after such edits
+
+        :return: None
+        '''
+
+        if self.data_frame_specific is None:
+            raise CosmicExcelCheckerException("Specific worksheet is not loaded. Use `set_sheet_name` to load it")
+
+        self._index_rows()
 
+    def _row_value(self, value: object, column: str) -> object:
+        # value of a ReqRow field, KeyError if its column is not in the sheet
+        if column in self._missing_columns:
+            raise KeyError(column)
+        return value
 
     def print_df(self):
         '''
@@ -549,35 +982,137 @@ class ResultSummary(PdExcel):
         else:
             raise CosmicExcelCheckerException("Specific worksheet is not loaded. Use `set_sheet_name` to load it")
 
-    def check_ratio(self) -> list[str, None]:
+    def check_ratio(self, sheet_name: Union[str, None] = None,
+                    as_frame: bool = False) -> Union[list[str, None], pd.DataFrame]:
         '''
-        check all columns workload and cfp ratio, default to 0.79
+        check all columns workload and cfp ratio, default to 0.79 (Workload_CFP_Ratio)
+        The whole sheet is checked at once, non-numeric workload or cfp cells are skipped
 
-        :return: a list contains all non-qualified requirements
+        :param sheet_name: worksheet to check, default to the one set by sheet_name/`set_sheet_name`
+        :param as_frame: bool for whether returning a pd.DataFrame of requirement number and name, default to False
+        :return: a list contains all non-qualified requirements, or a pd.DataFrame if as_frame is True
         '''
 
-        if self.data_frame_specific is None or RS_WORKLOAD_NAME not in self.data_frame_specific.columns or RS_TOTAL_CFP_NAME not in self.data_frame_specific.columns:
-            return list()
+        if sheet_name is None:
+            data_frame = self.data_frame_specific
+        else:
+            if isinstance(self.data_frames, dict) and sheet_name not in self.data_frames:
+                self.data_frames = _load_sheet(path=self.path, sheet_name=sheet_name, data_frames=self.data_frames,
+                                               skiprows=range(RS_SKIP_ROWS))
+
+            data_frame = self.data_frames.get(sheet_name, None) if isinstance(self.data_frames, dict) else None
 
-        result_summary = self.data_frame_specific.loc[:, [RS_REQ_NUM, RS_REQ_NAME, RS_WORKLOAD_NAME,RS_TOTAL_CFP_NAME]]
+        if data_frame is None or RS_WORKLOAD_NAME not in data_frame.columns or RS_TOTAL_CFP_NAME not in data_frame.columns:
+            return pd.DataFrame(columns=[RS_REQ_NUM, RS_REQ_NAME]) if as_frame else list()
 
-        bad_ratio : list[str, None] = []  # record
-        for index, row in result_summary.iterrows():
-            if math.ceil(int(row[RS_WORKLOAD_NAME]) / 0.79) < int(row[RS_TOTAL_CFP_NAME]):
-                bad_ratio.append(
-                    f'{RS_REQ_NUM}{row[RS_REQ_NUM]}, {RS_REQ_NAME}: {row[RS_REQ_NAME]}'
-                )
+        # same as int() on each cell, NaN if not a number
+        workload : np.ndarray = np.trunc(pd.to_numeric(data_frame[RS_WORKLOAD_NAME], errors='coerce').to_numpy(dtype=float))
+        total_cfp : np.ndarray = np.trunc(pd.to_numeric(data_frame[RS_TOTAL_CFP_NAME], errors='coerce').to_numpy(dtype=float))
+
+        with np.errstate(invalid='ignore'):  # comparison with NaN is False
+            bad_mask : np.ndarray = np.ceil(workload / Workload_CFP_Ratio) < total_cfp
+
+        bad_ratio : pd.DataFrame = data_frame.loc[bad_mask, [RS_REQ_NUM, RS_REQ_NAME]]
+
+        if as_frame:
+            return bad_ratio
+
+        return [f'{RS_REQ_NUM}{req_num}, {RS_REQ_NAME}: {req_name}'
+                for req_num, req_name in zip(bad_ratio[RS_REQ_NUM], bad_ratio[RS_REQ_NAME])]
+
+    def match_req_names(self, ratio: float = 0.8, limit: int = 1) -> pd.DataFrame:
+        '''
+        Fuzzy match every requirement name (RS_REQ_NAME) in the specific worksheet against the requirement names
+        found in all cosmic/non-cosmic files under folders_path, see `CheckObf.match`.
+        Useful for catching typo'd names or requirements placed in the wrong folder.
+
+        :param ratio: minimum similarity ratio to count as a match, default to 0.8
+        :param limit: max number of matches for each requirement, default to 1 (only the best match)
+        :return: a pd.DataFrame with columns RS_REQ_NUM, RS_REQ_NAME, path, file_req_name and similarity,
+        one row for each match
+        '''
 
-        return bad_ratio
+        if self.data_frame_specific is None:
+            raise CosmicExcelCheckerException("Specific worksheet is not loaded. Use `set_sheet_name` to load it")
+
+        # requirement names in files, each file only read once even if indexed under several folders
+        file_paths : list[str] = []
+        file_req_names : list[str] = []
+        for req_file in dict.fromkeys(req_file for req_files in self.req_index.values() for req_file in req_files):
+            try:
+                if req_file.kind == 'cosmic':
+                    req_excel = CosmicReqExcel(path=req_file.path)
+                    req_excel.load_excel(load_highlight=False, selective=True, parse_cache=self.parse_cache)
+                elif req_file.kind == 'noncosmic':
+                    req_excel = NonCosmicReqExcel(path=req_file.path)
+                    req_excel.load_excel(selective=True, parse_cache=self.parse_cache)
+                else:
+                    continue
+
+                req_name = req_excel.get_req_name()
+            except Exception:  # noqa, unreadable files are reported by `check_file`
+                continue
+
+            if isinstance(req_name, str):
+                file_paths.append(req_file.path)
+                file_req_names.append(req_name)
+
+        rows : list[tuple] = [
+            (req_num, req_name) for req_num, req_name in
+            zip(self.data_frame_specific[RS_REQ_NUM], self.data_frame_specific[RS_REQ_NAME])
+            if isinstance(req_name, str)
+        ]
+
+        matches = CheckObf.match(queries=[req_name for _, req_name in rows], candidates=file_req_names,
+                                 ratio=ratio, limit=limit)
+
+        return pd.DataFrame(
+            [(req_num, req_name, file_paths[idx], file_req_names[idx], similarity)
+             for (req_num, req_name), row_matches in zip(rows, matches) for idx, similarity in row_matches],
+            columns=[RS_REQ_NUM, RS_REQ_NAME, 'path', 'file_req_name', 'similarity']
+        )
 
     def check_file(self, req_num: int, check_final_confirmation: bool = True,
-                   check_highlight_cfp: bool = True) -> dict:
+                   check_highlight_cfp: bool = True, profile: bool = False,
+                   contents: Union[Dict[str, bytes], None] = None, as_record: bool = False) -> Union[dict, CheckResult]:
         '''
         check a single file data, comparing to the result summary xlsx
         check req number, req name, CFP total, CFP Total comparison
 
         :param: req_num is the requirement number 需求序号
-        :return: a dict-format result
+        :param profile: bool for whether adding "stages" (seconds spent in each stage, e.g. 'lookup', 'open',
+        'parse', 'fills', 'check_highlight', 'total') and "counts" ('files', 'bytes', 'rows' loaded) to the result.
+        Default to False
+        :param contents: raw bytes of requirement files already read, keyed by path. These files are parsed from
+        memory instead of being read again (see `prefetch` of `check_all_files`). Default to None
+        :param as_record: bool for whether returning a CheckResult with enum-coded issues instead of a dict with
+        a text note, default to False
+        :return: a dict-format result (or CheckResult), empty dict if the requirement number is unknown or repeated
+        '''
+
+        if not profile:
+            record = self._check_file(req_num=req_num, check_final_confirmation=check_final_confirmation,
+                                      check_highlight_cfp=check_highlight_cfp, timer=NULL_TIMER, contents=contents)
+        else:
+            timer = StageTimer()
+            with timer.stage('total'):
+                record = self._check_file(req_num=req_num, check_final_confirmation=check_final_confirmation,
+                                          check_highlight_cfp=check_highlight_cfp, timer=timer, contents=contents)
+            if record is not None:
+                record = record._replace(stages=timer.stages, counts=timer.counts)
+
+        if record is None:
+            return dict()
+
+        return record if as_record else record.to_dict()
+
+    def _check_file(self, req_num: int, check_final_confirmation: bool, check_highlight_cfp: bool,
+                    timer: Union[StageTimer, NullTimer],
+                    contents: Union[Dict[str, bytes], None] = None) -> Union[CheckResult, None]:
+        '''
+        Body of `check_file`, recording its stages in timer
+
+        :return: a CheckResult, or None if the requirement number is unknown or repeated
         '''
 
         try:
@@ -585,99 +1120,111 @@ class ResultSummary(PdExcel):
                 raise CosmicExcelCheckerException()
         except CosmicExcelCheckerException:
             print("Specific worksheet is not loaded. Use `set_sheet_name` to load it")
-            return dict()
+            return None
 
-        # get row indices qualified for req_num
-        r_indices : list = self.data_frame_specific.index[self.data_frame_specific[RS_REQ_NUM] == req_num].tolist()
+        # get the row of req_num from the index built when the sheet was loaded
+        with timer.stage('lookup'):
+            if self._rows_stale():
+                self._index_rows()
+            if RS_REQ_NUM in self._missing_columns:
+                raise KeyError(RS_REQ_NUM)
+            req_row : Union[ReqRow, None] = self._req_rows.get(req_num)
 
         try:
-            if len(r_indices) < 0:
-                raise UnknownREQNumException()
-
-            elif len(r_indices) > 1:
+            if self._req_num_counts.get(req_num, 0) > 1:
                 raise RepeatedREQNumException()
 
+            elif req_row is None:
+                raise UnknownREQNumException()
+
         except UnknownREQNumException:
             print(f"Sheet does not have a requirement number called {req_num}")
-            return dict()
+            return None
 
         except RepeatedREQNumException:
             print(f"Sheet has repeated rows for requirement number {req_num}")
-            return dict()
-
-        row_index = r_indices[0]
-
-        req_num = self.data_frame_specific.iloc[row_index, self.data_frame_specific.columns.get_loc(RS_REQ_NUM)]
+            return None
 
-        # requirement folder path based on req_num
-        req_folder_path_pattern = rf'{self.folders_path}\/(?:.*\/|){str(req_num)}\/'
+        req_num = req_row.req_num
 
-        # qualified paths inside self.file_paths
-        qualified_paths : list = [path for path in self.file_paths if re.match(pattern=req_folder_path_pattern, string=path)]
+        # qualified files under the requirement folder, looked up in req_index (built on first access)
+        with timer.stage('lookup'):
+            qualified_files : List[ReqFile] = self.req_index.get(str(req_num), [])
+        qualified_paths : list = [req_file.path for req_file in qualified_files]
+        contents = contents or {}
 
         if len(qualified_paths) == 0:  # no subfolder found
-            return {"REQ Num": req_num, "path": "Not exist", "match": False, "note": "REQ folder does not exist"}
+            return CheckResult(req_num=req_num, path="Not exist", issues=(Issue(kind=IssueKind.FOLDER_MISSING),))
 
-        qualified_cosmic = self.data_frame_specific.iloc[row_index, self.data_frame_specific.columns.get_loc(RS_QLF_COSMIC)]
+        def failed(kind: IssueKind, detail: str = '') -> CheckResult:
+            return CheckResult(req_num=req_num, path=qualified_paths[0], issues=(Issue(kind=kind, detail=detail),))
 
-        # check sr cosmic
-        def check_cosmic(path: str):
-            cosmic_excel = CosmicReqExcel(path=path)
-
-            # load excel to class df
-            cosmic_excel.load_excel()
+        qualified_cosmic = self._row_value(req_row.qualified_cosmic, RS_QLF_COSMIC)
 
-            note = ''
+        # check sr cosmic
+        def check_cosmic(path: str) -> List[Issue]:
+            # load excel to class df, only the sheets and columns used below
+            with timer.stage('load'):
+                cosmic_excel : CosmicReqExcel = self._load_req_excel(excel_class=CosmicReqExcel, path=path,
+                                                                      timer=timer, content=contents.get(path),
+                                                                      load_highlight=check_highlight_cfp,
+                                                                      fill_engine=self.fill_engine)
+
+            issues : List[Issue] = []
             # check req name
-            if self.data_frame_specific.iloc[
-                row_index, self.data_frame_specific.columns.get_loc(RS_REQ_NAME)] != cosmic_excel.get_req_name():
-                note += 'REQ name does not match (cosmic); '
+            with timer.stage('check_name'):
+                if self._row_value(req_row.req_name, RS_REQ_NAME) != cosmic_excel.get_req_name():
+                    issues.append(Issue(kind=IssueKind.COSMIC_REQ_NAME_MISMATCH))
 
             # check total CFP name
-            total_cfp: str = str(
-                self.data_frame_specific.iloc[row_index, self.data_frame_specific.columns.get_loc(RS_TOTAL_CFP_NAME)])
-            if total_cfp.isnumeric():
-                if float(total_cfp) != cosmic_excel.get_CFP_total():
-                    note += 'Total CFP points do not match (cosmic); '
-            else:
-                note += 'CFP points in Result Summary is not valid (cosmic); '
+            with timer.stage('check_cfp'):
+                total_cfp: str = str(self._row_value(req_row.total_cfp, RS_TOTAL_CFP_NAME))
+                if total_cfp.isnumeric():
+                    if float(total_cfp) != cosmic_excel.get_CFP_total():
+                        issues.append(Issue(kind=IssueKind.CFP_TOTAL_MISMATCH))
+                else:
+                    issues.append(Issue(kind=IssueKind.CFP_TOTAL_INVALID))
 
             # Check coefficient sheet
-            coefficient_sheet_match = cosmic_excel.check_coefficient_sheet()
+            with timer.stage('check_coefficient'):
+                coefficient_sheet_match = cosmic_excel.check_coefficient_sheet()
 
             if coefficient_sheet_match is None:
-                note += 'No Coefficient Sheet in Excel (cosmic); '
+                issues.append(Issue(kind=IssueKind.COEFFICIENT_SHEET_MISSING))
             elif coefficient_sheet_match is False:
-                note += 'Coefficient Sheet B1 data does not match total standard CFP pts; '
+                issues.append(Issue(kind=IssueKind.COEFFICIENT_MISMATCH))
 
             # check final confirmation worksheet
             if check_final_confirmation:
-                fc_result = cosmic_excel.check_final_confirmation()
+                with timer.stage('check_final_confirmation'):
+                    fc_result = cosmic_excel.check_final_confirmation()
                 if fc_result['note'] != "":
-                    note += f"{fc_result['note']}; "
+                    issues.append(Issue(kind=IssueKind.FINAL_CONFIRMATION, detail=fc_result['note']))
 
             # check highlight
             if check_highlight_cfp:
-                hl_result = cosmic_excel.check_highlight_cfp()
-                if hl_result != list():
-                    note += f"highlight err: {str(hl_result)}; "
+                with timer.stage('check_highlight'):
+                    hl_rows, hl_kinds = cosmic_excel.get_highlight_errors()
+                if len(hl_rows) > 0:
+                    issues.append(Issue(kind=IssueKind.HIGHLIGHT, rows=hl_rows, row_kinds=hl_kinds))
 
-            note = note.rstrip('; ')
+            if self.workbook_cache is None:  # not shared, free the frames now instead of at garbage collection
+                cosmic_excel.release()
 
-            return {"REQ Num": req_num, "path": path, "match": note == "", "note": note}
+            return issues
 
         # check sr noncosmic
-        def check_noncosmic(path: str):
-            noncosmic_excel = NonCosmicReqExcel(path=path)
-
-            # load excel to class df
-            noncosmic_excel.load_excel()
+        def check_noncosmic(path: str) -> List[Issue]:
+            # load excel to class df, only the sheets and columns used below
+            with timer.stage('load'):
+                noncosmic_excel : NonCosmicReqExcel = self._load_req_excel(excel_class=NonCosmicReqExcel, path=path,
+                                                                            timer=timer, content=contents.get(path))
 
-            note = ''
+            issues : List[Issue] = []
             # check req name
-            if self.data_frame_specific.iloc[
-                row_index, self.data_frame_specific.columns.get_loc(RS_REQ_NAME)] != noncosmic_excel.get_req_name():
-                note += 'REQ name does not match (noncosmic); '
+            with timer.stage('check_name'):
+                if self._row_value(req_row.req_name, RS_REQ_NAME) != noncosmic_excel.get_req_name():
+                    issues.append(Issue(kind=IssueKind.NONCOSMIC_REQ_NAME_MISMATCH))
 
             # make sure cfp total is 0 for non-cosmic file
             # total_cfp: str = str(
@@ -685,108 +1232,711 @@ class ResultSummary(PdExcel):
             # if float(total_cfp) != cosmic_cfp:  # cosmic_cfp is total cfp checked by cosmic file
             #     note += 'Total CFP points is not 0 for non-cosmic requirement; '
 
-            note = note.rstrip('; ')
-
-            return {"REQ Num": req_num, "path": path, "match": note == "", "note": note}
+            if self.workbook_cache is None:
+                noncosmic_excel.release()
 
-        # qualified paths parent folder
-        qualified_paths_docs = [path[path.rindex('/') + 1:] for path in qualified_paths]
+            return issues
 
         if qualified_cosmic == '是':
             if len(qualified_paths) == 1:
 
-                if not qualified_paths_docs[0].startswith(SR_COSMIC_FILE_PREFIX):
-                    return {"REQ Num": req_num, "path": qualified_paths[0], "match": False, "note": "Incorrect type of cosmic excel based on requirement"}
+                if qualified_files[0].kind != 'cosmic':
+                    return failed(IssueKind.INCORRECT_FILE_TYPE, "Incorrect type of cosmic excel based on requirement")
 
                 # file matched
                 try:
-                    return check_cosmic(path=qualified_paths[0])
+                    return CheckResult(req_num=req_num, path=qualified_paths[0],
+                                       issues=tuple(check_cosmic(path=qualified_paths[0])))
                 except KeyError:
-                    return {"REQ Num": req_num, "path": qualified_paths[0], "match": False, "note": "KeyError, Check column name"}
+                    return failed(IssueKind.COLUMN_KEY_ERROR)
 
             else:
-                return {"REQ Num": req_num, "path": qualified_paths[0], "match": False, "note": "Incorrect number of cosmic excel(s) based on requirement"}
+                return failed(IssueKind.INCORRECT_FILE_COUNT, "Incorrect number of cosmic excel(s) based on requirement")
 
         elif qualified_cosmic == '否':
             if len(qualified_paths) == 1:
 
-                if not qualified_paths_docs[0].startswith(SR_NONCOSMIC_FILE_PREFIX):
-                    return {"REQ Num": req_num, "path": qualified_paths[0], "match": False,
-                            "note": "Incorrect type of cosmic excel based on requirement"}
+                if qualified_files[0].kind != 'noncosmic':
+                    return failed(IssueKind.INCORRECT_FILE_TYPE, "Incorrect type of cosmic excel based on requirement")
 
                 # file matched
                 try:
-                    return check_noncosmic(path=qualified_paths[0])
+                    return CheckResult(req_num=req_num, path=qualified_paths[0],
+                                       issues=tuple(check_noncosmic(path=qualified_paths[0])))
                 except KeyError:
-                    return {"REQ Num": req_num, "path": qualified_paths[0], "match": False,
-                            "note": "KeyError, Check column name"}
+                    return failed(IssueKind.COLUMN_KEY_ERROR)
 
             else:
-                return {"REQ Num": req_num, "path": qualified_paths[0], "match": False,
-                        "note": "Incorrect number of non-cosmic excel(s) based on requirement"}
+                return failed(IssueKind.INCORRECT_FILE_COUNT,
+                              "Incorrect number of non-cosmic excel(s) based on requirement")
 
         elif qualified_cosmic == '混合型':
             if len(qualified_paths) == 2:
-                c_prefix_pattern = rf"{req_folder_path_pattern}(?:.*\/|){SR_SUBFOLDER_NAME}\/{SR_COSMIC_FILE_PREFIX}"
-                nc_prefix_pattern = rf"{req_folder_path_pattern}(?:.*\/|){SR_SUBFOLDER_NAME}\/{SR_NONCOSMIC_FILE_PREFIX}"
+                # both files have to be directly under the subfolder
+                kinds = [req_file.kind if req_file.in_subfolder else None for req_file in qualified_files]
 
                 try:
-                    if bool(re.match(c_prefix_pattern, qualified_paths[1])) and \
-                            bool(re.match(nc_prefix_pattern, qualified_paths[0])):
-                        c_result: dict = check_cosmic(path=qualified_paths[1])
-                        nc_result : dict = check_noncosmic(path=qualified_paths[0])
-
-                    elif bool(re.match(c_prefix_pattern, qualified_paths[0])) and \
-                            bool(re.match(nc_prefix_pattern, qualified_paths[1])):
-                        c_result : dict = check_cosmic(path=qualified_paths[0])
-                        nc_result : dict = check_noncosmic(path=qualified_paths[1])
+                    if kinds == ['noncosmic', 'cosmic']:
+                        c_issues : List[Issue] = check_cosmic(path=qualified_paths[1])
+                        nc_issues : List[Issue] = check_noncosmic(path=qualified_paths[0])
+
+                    elif kinds == ['cosmic', 'noncosmic']:
+                        c_issues : List[Issue] = check_cosmic(path=qualified_paths[0])
+                        nc_issues : List[Issue] = check_noncosmic(path=qualified_paths[1])
                     else:
-                        return {"REQ Num": req_num, "path": qualified_paths[0], "match": False,
-                                "note": "Incorrect type of cosmic/non-cosmic excel based on requirement"}
+                        return failed(IssueKind.INCORRECT_FILE_TYPE,
+                                      "Incorrect type of cosmic/non-cosmic excel based on requirement")
 
-                    return {"REQ Num": req_num, "path": qualified_paths[0], "match": c_result['match'] & nc_result['match'],
-                        "note": (c_result['note'] + '; ' + nc_result['note']).rstrip('; ')}
+                    return CheckResult(req_num=req_num, path=qualified_paths[0], issues=tuple(c_issues + nc_issues),
+                                       mixed=True)
 
                 except KeyError:
-                    return {"REQ Num": req_num, "path": qualified_paths[0], "match": False, "note": "KeyError, Check column name"}
+                    return failed(IssueKind.COLUMN_KEY_ERROR)
 
             else:
-                return {"REQ Num": req_num, "path": qualified_paths[0], "match": False,
-                        "note": "Incorrect number of cosmic/non-cosmic excel(s) based on requirement"}
+                return failed(IssueKind.INCORRECT_FILE_COUNT,
+                              "Incorrect number of cosmic/non-cosmic excel(s) based on requirement")
+
+        else:
+            return failed(IssueKind.UNKNOWN_QUALIFIER, str(qualified_cosmic))
+
+    def _load_req_excel(self, excel_class: type, path: str, timer: Union[StageTimer, NullTimer] = NULL_TIMER,
+                        content: Union[bytes, None] = None, **kwargs) -> Union[CosmicReqExcel, NonCosmicReqExcel]:
+        '''
+        Load a requirement file selectively, through workbook_cache if it is set
+
+        :param excel_class: CosmicReqExcel or NonCosmicReqExcel
+        :param path: path to the requirement file
+        :param timer: a StageTimer to record loading stages and 'files', 'bytes' and 'rows' counts
+        :param content: raw bytes of the file if already read, default to None (read from path)
+        :param kwargs: other arguments of `load_excel`
+        :return: the loaded excel object
+        '''
+
+        def load():
+            req_excel = excel_class(path=path)
+            req_excel.load_excel(selective=True, parse_cache=self.parse_cache, timer=timer, content=content, **kwargs)
+            return req_excel
 
+        if self.workbook_cache is None:
+            req_excel = load()
         else:
-            return {"REQ Num": req_num, "path": qualified_paths[0], "match": False,
-                    "note": f"The parameter {qualified_cosmic} is not accepted"}
+            req_excel = self.workbook_cache.get_or_load(path=path, loader=load,
+                                                        variant=repr((excel_class.__name__, sorted(kwargs.items()))))
+
+        if isinstance(timer, StageTimer):
+            timer.count('files')
+            timer.count('bytes', os.path.getsize(path))
+            timer.count('rows', sum(len(df.index) for df in req_excel.data_frames.values()))
+
+        return req_excel
 
     def check_all_files(self, check_final_confirmation: bool = True,
-                        check_highlight_cfp: bool = True) -> dict[str, list[dict, None]]:
+                        check_highlight_cfp: bool = True, max_workers: Union[int, None] = 1,
+                        chunksize: int = 1, profile: bool = False,
+                        on_result: Union[Callable[[Union[dict, CheckResult]], None], None] = None,
+                        prefetch: int = 0, memory_budget: Union[int, None] = None,
+                        as_record: bool = False) -> dict[str, list[dict, None]]:
         '''
         Check all related files listed in the result summary.
         Call `check_file` function for each single check.
-        The time complexity is omega(n^2) for calling n items in the Excel of result summary.
+        Requirement rows are looked up in the index built when the sheet is loaded, so checking n items of the
+        result summary takes O(n) lookups besides loading the requirement files.
+
+        If max_workers is not 1, requirements are spread across a process pool. Each worker receives a copy of
+        this instance once (not once per requirement) and results are returned in the same order as the sheet.
 
         :param check_final_confirmation: bool for whether checking final confirmation, default to True
         :param check_highlight_cfp: bool for whether checking highlighting and corresponding cfp, default to True
-        :return: A list of results in dict-format. Could be empty list if nothing found.
+        :param max_workers: number of worker processes, default to 1 (no pool). None means os.cpu_count()
+        :param chunksize: number of requirements sent to a worker at a time when using a pool, default to 1
+        :param profile: bool for whether timing the stages of every check (see `check_file`), default to False.
+        If True, the returned dict also has "profile" with percentiles of every stage (see `summarize_stages`)
+        :param on_result: function called with each result as soon as it is checked, e.g. to feed a metrics system.
+        It gets the same results as returned, CheckResult if as_record is True (`CheckResult.to_dict()` gives the
+        dict-format result) and dict-format otherwise
+        :param prefetch: number of requirements whose files are read ahead by background threads while the current
+        one is parsed, default to 0 (no prefetch). Useful on network shares where reading a file is slow.
+        At most prefetch + 1 requirements of raw file bytes are kept in memory. Only used without a process pool
+        :param memory_budget: RSS budget of the run in bytes, default to None (not bounded). When the RSS of a
+        process goes over it, workbook_cache is cleared, garbage is collected and prefetch pauses until it is back
+        under. With a pool, fewer workers are started if the budget cannot hold them, and each worker gets an equal
+        share. The returned dict also has "peak_memory", the peak RSS in bytes of any process sampled between checks
+        :param as_record: bool for whether results are CheckResult instead of dict (see `check_file`), default to
+        False. Use `result.records_to_frame` / `result.issues_to_frame` to get them as DataFrames
+        :return: A list of results in dict-format (CheckResult if as_record is True). Could be empty list if nothing found.
         '''
 
         if self.data_frame_specific is None:
             raise CosmicExcelCheckerException("Specific worksheet is not loaded. Use `set_sheet_name` to load it")
 
         start_time = time.time()
-        # use iterrows() to iterate each row in DataFrame
-        list_results : list[dict, None] = []
-        for index, row in self.data_frame_specific.iterrows():
-            list_results.append(self.check_file(
-                req_num=row[RS_REQ_NUM],
-                check_final_confirmation=check_final_confirmation,
-                check_highlight_cfp=check_highlight_cfp
-            ))
 
         cf_results = {
-            "results": list_results,
+            "results": list(self.iter_check_all_files(check_final_confirmation=check_final_confirmation,
+                                                      check_highlight_cfp=check_highlight_cfp,
+                                                      max_workers=max_workers, chunksize=chunksize,
+                                                      profile=profile, on_result=on_result, prefetch=prefetch,
+                                                      memory_budget=memory_budget, as_record=as_record)),
             "time": round(time.time() - start_time, 5)
         }
 
+        if memory_budget is not None:
+            cf_results["peak_memory"] = self.peak_memory
+
+        if profile:
+            cf_results["profile"] = summarize_stages(results=cf_results["results"])
+
         return cf_results
 
+    def check_all_files_incremental(self, state_path: str, check_final_confirmation: bool = True,
+                                    check_highlight_cfp: bool = True, max_workers: Union[int, None] = 1,
+                                    chunksize: int = 1) -> dict[str, Union[list[dict, None], float, int]]:
+        '''
+        Same as `check_all_files`, but only re-check requirements changed since the last run saved in state_path.
+        A requirement is checked again if its row in the result summary, the number of rows with the same
+        requirement number, or the path, size or mtime of any file under its folder changed.
+        All requirements are checked again if the check options or fill_engine differ from the last run.
+        Results of all requirements are saved back to state_path for the next run.
+
+        :param state_path: path to the state file of previous run, created if it does not exist
+        :param check_final_confirmation: bool for whether checking final confirmation, default to True
+        :param check_highlight_cfp: bool for whether checking highlighting and corresponding cfp, default to True
+        :param max_workers: number of worker processes, default to 1 (no pool). None means os.cpu_count()
+        :param chunksize: number of requirements sent to a worker at a time when using a pool, default to 1
+        :return: dict of results (in the order of the sheet), time and the number of re-checked requirements
+        '''
+
+        if self.data_frame_specific is None:
+            raise CosmicExcelCheckerException("Specific worksheet is not loaded. Use `set_sheet_name` to load it")
+
+        start_time = time.time()
+
+        # results are only reusable if they were checked and loaded the same way. Requirement files are always
+        # loaded selectively and prefetched content is the file itself, so fill_engine is the only loading option
+        scope = (self.path, self.sheet_name, self.folders_path, check_final_confirmation, check_highlight_cfp,
+                 self.fill_engine)
+
+        previous : dict = {}
+        try:
+            with open(state_path, 'rb') as f:
+                state = pickle.load(f)
+            if isinstance(state, dict) and state.get('scope') == scope:
+                previous = state['requirements']
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+            pass
+
+        req_nums : list = self.data_frame_specific[RS_REQ_NUM].tolist()
+        if self._rows_stale():
+            self._index_rows()
+        req_counts : dict = self._req_num_counts
+
+        fingerprints : list[str] = []
+        for req_num, row in zip(req_nums, self.data_frame_specific.itertuples(index=False, name=None)):
+            file_stats : list = []
+            for req_file in self.req_index.get(str(req_num), []):
+                try:
+                    stat = os.stat(req_file.path)
+                    file_stats.append((req_file.path, stat.st_size, stat.st_mtime_ns))
+                except OSError:
+                    file_stats.append((req_file.path, None, None))
+
+            fingerprints.append(hashlib.sha1(
+                repr((row, req_counts.get(req_num), file_stats)).encode('utf-8')
+            ).hexdigest())
+
+        # positions of rows that have to be checked again
+        changed : list[int] = [
+            i for i, (req_num, fingerprint) in enumerate(zip(req_nums, fingerprints))
+            if previous.get(str(req_num), (None, None))[0] != fingerprint
+        ]
+
+        changed_results = self._check_req_nums(req_nums=[req_nums[i] for i in changed],
+                                               check_final_confirmation=check_final_confirmation,
+                                               check_highlight_cfp=check_highlight_cfp, max_workers=max_workers,
+                                               chunksize=chunksize)
+        new_results : dict = dict(zip(changed, changed_results))
+
+        list_results : list[dict, None] = [
+            new_results[i] if i in new_results else previous[str(req_num)][1] for i, req_num in enumerate(req_nums)
+        ]
+
+        # save state, write to a temporary file first so a broken run never leaves a partial state
+        state = {
+            'scope': scope,
+            'requirements': {str(req_num): (fingerprint, result)
+                             for req_num, fingerprint, result in zip(req_nums, fingerprints, list_results)}
+        }
+        tmp_path = f'{state_path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, state_path)
+
+        return {
+            "results": list_results,
+            "time": round(time.time() - start_time, 5),
+            "rechecked": len(changed)
+        }
+
+    def iter_check_all_files(self, check_final_confirmation: bool = True, check_highlight_cfp: bool = True,
+                             max_workers: Union[int, None] = 1, chunksize: int = 1, ordered: bool = True,
+                             sink: Union[str, None] = None, profile: bool = False,
+                             on_result: Union[Callable[[Union[dict, CheckResult]], None], None] = None,
+                             prefetch: int = 0, memory_budget: Union[int, None] = None,
+                             as_record: bool = False) -> Iterator[Union[dict, CheckResult]]:
+        '''
+        Generator version of `check_all_files`. Yield the result of each requirement as soon as it is checked,
+        and optionally write each result to a JSON lines (.jsonl) or CSV (.csv) file at the same time
+
+        :param check_final_confirmation: bool for whether checking final confirmation, default to True
+        :param check_highlight_cfp: bool for whether checking highlighting and corresponding cfp, default to True
+        :param max_workers: number of worker processes, default to 1 (no pool). None means os.cpu_count()
+        :param chunksize: number of requirements sent to a worker at a time when using a pool, default to 1
+        :param ordered: bool for whether yielding in the order of the sheet, default to True.
+        If False and a pool is used, results are yielded in the order they complete
+        :param sink: path to a .jsonl or .csv file to stream results into, default to None
+        :param profile: bool for whether adding "stages" and "counts" to every result (see `check_file`)
+        :param on_result: function called with each result before it is yielded, default to None.
+        It gets CheckResult if as_record is True (`CheckResult.to_dict()` gives the dict-format result), dict otherwise
+        :param prefetch: number of requirements whose files are read ahead while the current one is parsed,
+        default to 0 (no prefetch). Only used without a process pool (see `check_all_files`)
+        :param memory_budget: RSS budget of the run in bytes (see `check_all_files`), the peak RSS is kept in
+        `peak_memory`. Default to None (not bounded)
+        :param as_record: bool for whether yielding CheckResult instead of dict, default to False.
+        The sink still gets dict-format results
+        :return: iterator of results in dict-format (CheckResult if as_record is True)
+        '''
+
+        if self.data_frame_specific is None:
+            raise CosmicExcelCheckerException("Specific worksheet is not loaded. Use `set_sheet_name` to load it")
+
+        req_nums : list = self.data_frame_specific[RS_REQ_NUM].tolist()
+        results = self._iter_req_nums(req_nums=req_nums, check_final_confirmation=check_final_confirmation,
+                                      check_highlight_cfp=check_highlight_cfp, max_workers=max_workers,
+                                      chunksize=chunksize, ordered=ordered, profile=profile, prefetch=prefetch,
+                                      memory_budget=memory_budget, as_record=as_record)
+
+        if on_result is not None:
+            results = _call_each(results=results, func=on_result)
+
+        if sink is None:
+            yield from results
+            return
+
+        with _ResultWriter(path=sink) as writer:
+            for result in results:
+                writer.write(result)
+                yield result
+
+    def _check_req_nums(self, req_nums: list, check_final_confirmation: bool, check_highlight_cfp: bool,
+                        max_workers: Union[int, None], chunksize: int) -> list[dict, None]:
+        '''
+        Call `check_file` for each requirement number, in a process pool if max_workers is not 1
+
+        :return: list of results in the same order as req_nums
+        '''
+
+        return list(self._iter_req_nums(req_nums=req_nums, check_final_confirmation=check_final_confirmation,
+                                        check_highlight_cfp=check_highlight_cfp, max_workers=max_workers,
+                                        chunksize=chunksize))
+
+    def _iter_req_nums(self, req_nums: list, check_final_confirmation: bool, check_highlight_cfp: bool,
+                       max_workers: Union[int, None], chunksize: int, ordered: bool = True,
+                       profile: bool = False, prefetch: int = 0,
+                       memory_budget: Union[int, None] = None,
+                       as_record: bool = False) -> Iterator[Union[dict, CheckResult]]:
+        '''
+        Call `check_file` for each requirement number and yield results, in a process pool if max_workers is not 1
+        Without a pool, files of the next `prefetch` requirements are read in background threads
+
+        :return: iterator of results, in the same order as req_nums if ordered is True
+        '''
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+
+        monitor = MemoryMonitor(budget=memory_budget)
+        if memory_budget is not None:
+            self.peak_memory = monitor.sample()
+
+        if max_workers <= 1 or len(req_nums) <= 1:
+            if prefetch > 0:
+                checks = _prefetch_files(
+                    items=req_nums, depth=prefetch,
+                    paths=lambda req_num: [req_file.path for req_file in self.req_index.get(str(req_num), [])],
+                    pause=monitor.over_budget if memory_budget is not None else None
+                )
+            else:
+                checks = ((req_num, None) for req_num in req_nums)
+
+            for req_num, contents in checks:
+                result = self.check_file(
+                    req_num=req_num,
+                    check_final_confirmation=check_final_confirmation,
+                    check_highlight_cfp=check_highlight_cfp,
+                    profile=profile,
+                    contents=contents,
+                    as_record=as_record
+                )
+                if memory_budget is not None:
+                    if monitor.over_budget():
+                        self._release_memory()
+                    self.peak_memory = monitor.peak
+                yield result
+            return
+
+        self.discover()  # search once here, not again in every worker
+
+        workers : int = min(max_workers, len(req_nums))
+        worker_budget : Union[int, None] = None
+        if memory_budget is not None:
+            # every worker starts about as large as this process, keep room for this process too
+            rss = monitor.sample() or 0
+            if rss > 0:
+                workers = max(1, min(workers, memory_budget // rss - 1))
+            worker_budget = max(memory_budget - rss, 0) // workers
+
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(self, check_final_confirmation, check_highlight_cfp, profile,
+                                                 worker_budget, as_record))
+        worker = _check_file_worker if memory_budget is None else _check_file_worker_bounded
+        try:
+            if ordered:
+                # executor.map keeps the submission order, so results line up with rows in the sheet
+                results = executor.map(worker, req_nums, chunksize=max(chunksize, 1))
+            else:
+                futures = [executor.submit(worker, req_num) for req_num in req_nums]
+                results = (future.result() for future in as_completed(futures))
+
+            if memory_budget is None:
+                yield from results
+                return
+
+            for result, worker_peak in results:
+                monitor.observe(worker_peak)
+                monitor.sample()
+                self.peak_memory = monitor.peak
+                yield result
+        finally:
+            # do not wait for requirements nobody will read if the caller stopped early
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _release_memory(self) -> None:
+        '''
+        Free memory when a memory-bounded run is over its budget: drop workbook_cache entries and collect garbage,
+        so frames and workbooks kept alive by reference cycles are freed now
+
+        :return: None
+        '''
+
+        if self.workbook_cache is not None:
+            self.workbook_cache.clear()
+        gc.collect()
+
+class BatchResultSummary:
+    '''
+    Check several result summary worksheets (possibly in several files) at once
+    Requirement files referenced by more than one worksheet are loaded only once: all summaries share a
+    WorkbookCache, and rows pointing at the same requirement files are checked one after another
+    '''
+
+    def __init__(self, summaries: List[tuple], folders_path: str, parse_cache: Union[ParseCache, None] = None,
+                 workbook_cache: Union[WorkbookCache, None] = None, scan_workers: int = 1,
+                 index_path: Union[str, None] = None, fill_engine: str = 'openpyxl'):
+        '''
+        :param summaries: list of (result summary path, sheet name) or (result summary path, sheet name, folders path)
+        Summaries listed more than once are checked once
+        :param folders_path: folders path of the summaries not giving their own
+        :param parse_cache: an on-disk ParseCache used when loading requirement files, default to None (no cache)
+        :param workbook_cache: the in-memory WorkbookCache shared by all summaries, default to a new one
+        :param scan_workers: number of threads to walk each folders path, default to 1 (no thread pool)
+        :param index_path: JSON file of a persisted FileIndex, only used for the default folders_path
+        :param fill_engine: how sub-process fill colours are read, 'openpyxl' (default) or 'xml'
+        (see `ResultSummary`)
+        '''
+
+        # summaries listed more than once are kept once, in the order they first appear
+        self.summaries : List[tuple[str, str, str]] = list(dict.fromkeys(
+            (FindExcels.path_format(path=summary[0]), summary[1],
+             FindExcels.path_format(path=summary[2] if len(summary) > 2 else folders_path))
+            for summary in summaries
+        ))
+        self.folders_path : str = FindExcels.path_format(path=folders_path)
+        self.parse_cache : Union[ParseCache, None] = parse_cache
+        self.workbook_cache : WorkbookCache = WorkbookCache() if workbook_cache is None else workbook_cache
+        self.scan_workers : int = scan_workers
+        self.index_path : Union[str, None] = index_path
+        self.fill_engine : str = fill_engine
+        self.result_summaries : Union[List[ResultSummary], None] = None
+
+    def load_excel(self) -> None:
+        '''
+        Load the worksheet of every summary. A summary file is opened once and all its listed worksheets
+        are parsed together, each folders path is searched once
+
+        :return: None
+        '''
+
+        sheets : Dict[str, Dict[str, None]] = {}  # {summary path: {worksheet: None}}, usecols of `_parse_selected`
+        for path, sheet_name, _ in self.summaries:
+            sheets.setdefault(path, {})[sheet_name] = None
+
+        data_frames : Dict[str, Dict[str, pd.DataFrame]] = {}  # {summary path: loaded worksheets}
+        file_paths : Dict[str, list[str]] = {}  # {folders path: requirement files}
+
+        self.result_summaries = []
+        for path, sheet_name, folders_path in self.summaries:
+            result_summary = ResultSummary(
+                path=path, folders_path=folders_path, sheet_name=sheet_name, parse_cache=self.parse_cache,
+                scan_workers=self.scan_workers, workbook_cache=self.workbook_cache,
+                index_path=self.index_path if folders_path == self.folders_path else None,
+                file_paths=file_paths.get(folders_path, None), fill_engine=self.fill_engine
+            )
+
+            if path not in data_frames:
+                if path[path.rindex('.'):] not in ('.xlsx', '.xls'):
+                    raise IncorrectFileTypeException(f"{path} is not a valid relative file path for an Excel file")
+
+                # all worksheets of this file that are listed in summaries
+                with pd.ExcelFile(path) as excel_file:
+                    data_frames[path] = _parse_selected(excel_file=excel_file, sheets=sheets[path],
+                                                        skiprows=range(RS_SKIP_ROWS))
+
+            result_summary.data_frames = data_frames[path]
+            result_summary.set_sheet_name(sheet_name=sheet_name)
+
+            file_paths[folders_path] = result_summary.file_paths
+            self.result_summaries.append(result_summary)
+
+    def check_all_files(self, check_final_confirmation: bool = True,
+                        check_highlight_cfp: bool = True) -> dict:
+        '''
+        Check all related files listed in every summary, see `ResultSummary.check_all_files`
+
+        :param check_final_confirmation: bool for whether checking final confirmation, default to True
+        :param check_highlight_cfp: bool for whether checking highlighting and corresponding cfp, default to True
+        :return: dict of "results" ({(summary path, sheet name): list of results in sheet order}),
+        "time" and "loaded" (number of requirement files loaded)
+        '''
+
+        if self.result_summaries is None:
+            self.load_excel()
+
+        start_time = time.time()
+        misses = self.workbook_cache.misses
+
+        # group rows of all summaries by the requirement files they point at
+        groups : Dict[tuple, list[tuple[int, int, object]]] = {}
+        results : list[list] = []
+        for summary_idx, result_summary in enumerate(self.result_summaries):
+            req_nums : list = result_summary.data_frame_specific[RS_REQ_NUM].tolist()
+            results.append([None] * len(req_nums))
+
+            for row_idx, req_num in enumerate(req_nums):
+                key = tuple(req_file.path for req_file in result_summary.req_index.get(str(req_num), []))
+                groups.setdefault(key, []).append((summary_idx, row_idx, req_num))
+
+        for rows in groups.values():
+            for summary_idx, row_idx, req_num in rows:
+                results[summary_idx][row_idx] = self.result_summaries[summary_idx].check_file(
+                    req_num=req_num,
+                    check_final_confirmation=check_final_confirmation,
+                    check_highlight_cfp=check_highlight_cfp
+                )
+
+        batch_results : dict = {}
+        for (path, sheet_name, _), summary_results in zip(self.summaries, results):
+            batch_results[(path, sheet_name)] = summary_results
+
+        return {
+            "results": batch_results,
+            "time": round(time.time() - start_time, 5),
+            "loaded": self.workbook_cache.misses - misses
+        }
+
+class _ResultWriter:
+    '''
+    Write results of `check_file` one by one to a JSON lines (.jsonl) or CSV (.csv) file
+    Each result is flushed right away, so the file can be read while checking is still running
+    '''
+
+    CSV_FIELDS : list[str] = ["REQ Num", "path", "match", "note"]
+
+    def __init__(self, path: str):
+        file_ext = path[path.rindex('.'):] if '.' in path else ''
+
+        if file_ext not in ('.jsonl', '.csv'):
+            raise IncorrectFileTypeException(f"{path} is not a valid file path for results. It has to be .jsonl or .csv file")
+
+        self.path : str = path
+        self.file_format : str = file_ext
+        self._file = None
+        self._csv_writer : Union[csv.DictWriter, None] = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'w', encoding='utf-8', newline='')
+
+        if self.file_format == '.csv':
+            self._csv_writer = csv.DictWriter(self._file, fieldnames=_ResultWriter.CSV_FIELDS, extrasaction='ignore')
+            self._csv_writer.writeheader()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._file.close()
+
+    def write(self, result: Union[dict, CheckResult]) -> None:
+        if isinstance(result, CheckResult):
+            result = result.to_dict()
+
+        if self._csv_writer is not None:
+            self._csv_writer.writerow(result)
+        else:
+            self._file.write(json.dumps(result, ensure_ascii=False, default=_json_default) + '\n')
+
+        self._file.flush()
+
+def _json_default(obj):
+    '''
+    Convert objects unknown to json (e.g. numpy scalars read by pandas) when writing results
+    '''
+
+    if isinstance(obj, np.generic):
+        return obj.item()
+
+    return str(obj)
+
+def _parse_selected(excel_file: pd.ExcelFile, sheets: Dict[str, Union[Callable[[str], bool], None]],
+                    **kwargs) -> Dict[str, pd.DataFrame]:
+    '''
+    Parse only the given sheets from an opened Excel file, sheets that do not exist are skipped
+
+    :param excel_file: an opened pd.ExcelFile
+    :param sheets: dict of {sheet name: usecols}, usecols is None for all columns or a callable to select columns
+    :param kwargs: other keyword arguments passed to `pd.ExcelFile.parse`
+    :return: dict of {sheet name: pd.DataFrame}
+    '''
+
+    return {
+        sheet_name: excel_file.parse(sheet_name=sheet_name, usecols=usecols, **kwargs)
+        for sheet_name, usecols in sheets.items() if sheet_name in excel_file.sheet_names
+    }
+
+def _load_sheet(path: str, sheet_name: str, data_frames: Union[Dict[str, pd.DataFrame], None],
+                **kwargs) -> Dict[str, pd.DataFrame]:
+    '''
+    Load a single sheet with all columns and add it to the loaded dataframes
+
+    :param path: path to the Excel file
+    :param sheet_name: name of the worksheet
+    :param data_frames: dataframes loaded before, could be None
+    :param kwargs: other keyword arguments passed to `pd.ExcelFile.parse`
+    :return: dict of {sheet name: pd.DataFrame} containing the new sheet
+    '''
+
+    with pd.ExcelFile(path) as excel_file:
+        if sheet_name not in excel_file.sheet_names:
+            raise SheetNotFoundException(f"Sheet with name {sheet_name} is not found inside the given file")
+
+        data_frames = dict(data_frames) if isinstance(data_frames, dict) else dict()
+        data_frames[sheet_name] = excel_file.parse(sheet_name=sheet_name, **kwargs)
+
+    return data_frames
+
+def _call_each(results: Iterator[Union[dict, CheckResult]],
+               func: Callable[[Union[dict, CheckResult]], None]) -> Iterator[Union[dict, CheckResult]]:
+    # call func with every result (dict or CheckResult), then pass it on
+    for result in results:
+        func(result)
+        yield result
+
+# state of a worker process used by `ResultSummary.check_all_files`, set once by `_init_worker`
+_worker_state : dict = {}
+
+def _prefetch_files(items: list, paths: Callable[[object], List[str]], depth: int,
+                    pause: Union[Callable[[], bool], None] = None) -> Iterator[Tuple[object, Dict[str, bytes]]]:
+    '''
+    Read the files of the next `depth` items in background threads while the caller handles the current one
+    At most depth + 1 items of file contents are held in memory. A file that cannot be read is left out,
+    so it is read again (and fails as usual) from its path
+
+    :param items: items to handle, yielded in the same order
+    :param paths: function returning the file paths of an item
+    :param depth: number of items to read ahead
+    :param pause: function telling whether to stop reading ahead for now, e.g. when over a memory budget.
+    Items already read are handed out first and the next one is only read when the caller asks for it
+    :return: iterator of (item, {path: raw bytes})
+    '''
+
+    pending : deque = deque()  # (item, [(path, future)]), in the order of items
+    executor = ThreadPoolExecutor(max_workers=depth)
+
+    def resolve(entry: tuple) -> Tuple[object, Dict[str, bytes]]:
+        item, futures = entry
+        return item, {path: future.result() for path, future in futures if future.exception() is None}
+
+    try:
+        for item in items:
+            while pending and pause is not None and pause():
+                yield resolve(pending.popleft())
+
+            pending.append((item, [(path, executor.submit(_read_bytes, path)) for path in paths(item)]))
+            if len(pending) > depth:
+                yield resolve(pending.popleft())
+
+        while pending:
+            yield resolve(pending.popleft())
+    finally:
+        # do not read files nobody will parse if the caller stopped early
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _init_worker(result_summary: ResultSummary, check_final_confirmation: bool, check_highlight_cfp: bool,
+                 profile: bool = False, memory_budget: Union[int, None] = None, as_record: bool = False):
+    '''
+    Initializer of worker processes. Keep the (pickled) ResultSummary for all later tasks of this worker
+
+    :return: None
+    '''
+
+    _worker_state['result_summary'] = result_summary
+    _worker_state['check_final_confirmation'] = check_final_confirmation
+    _worker_state['check_highlight_cfp'] = check_highlight_cfp
+    _worker_state['profile'] = profile
+    _worker_state['memory'] = MemoryMonitor(budget=memory_budget)
+    _worker_state['as_record'] = as_record
+
+def _check_file_worker(req_num) -> Union[dict, CheckResult]:
+    '''
+    Check a single requirement inside a worker process
+
+    :param req_num: requirement number 需求序号
+    :return: a dict-format result (or CheckResult), same as `ResultSummary.check_file`
+    '''
+
+    return _worker_state['result_summary'].check_file(
+        req_num=req_num,
+        check_final_confirmation=_worker_state['check_final_confirmation'],
+        check_highlight_cfp=_worker_state['check_highlight_cfp'],
+        profile=_worker_state['profile'],
+        as_record=_worker_state['as_record']
+    )
+
+def _check_file_worker_bounded(req_num) -> Tuple[dict, Union[int, None]]:
+    '''
+    Check a single requirement inside a worker process of a memory-bounded run
+
+    :param req_num: requirement number 需求序号
+    :return: the result of `_check_file_worker` and the peak RSS of this worker so far
+    '''
+
+    result = _check_file_worker(req_num)
+
+    monitor : MemoryMonitor = _worker_state['memory']
+    if monitor.over_budget():
+        _worker_state['result_summary']._release_memory()
+
+    return result, monitor.peak
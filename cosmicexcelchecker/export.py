@@ -0,0 +1,173 @@
+# Bulk export of check results to columnar files and to an annotated copy of the result summary
+
+from typing import Union, Iterable, TYPE_CHECKING
+from openpyxl import Workbook
+
+from .result import CheckResult
+from .errors import CosmicExcelCheckerException, IncorrectFileTypeException
+from .conf import RS_SKIP_ROWS
+
+import openpyxl
+import pandas as pd
+
+if TYPE_CHECKING:
+    from .cosmic import ResultSummary
+
+RESULT_FORMATS : tuple = ('.parquet', '.feather', '.csv')
+TEXT_COLUMNS : tuple = ('path', 'note')
+
+def results_to_frame(results: Iterable[Union[dict, CheckResult]]) -> pd.DataFrame:
+    '''
+    Turn the results of `check_all_files` into a single DataFrame
+    Empty results (unknown or repeated requirement numbers) are skipped. "stages" and "counts" of profiled
+    results are flattened into `stage_<name>` and `count_<name>` columns
+
+    :param results: "results" of `check_all_files`, in dict-format or CheckResult
+    :return: pd.DataFrame with "REQ Num", "path", "match", "note" and the flattened profile columns
+    '''
+
+    rows : list = []
+    for result in results:
+        if isinstance(result, CheckResult):
+            result = result.to_dict()
+        if not result:
+            continue
+
+        row = {key: value for key, value in result.items() if key not in ('stages', 'counts')}
+        row.update({f'stage_{name}': seconds for name, seconds in result.get('stages', {}).items()})
+        row.update({f'count_{name}': value for name, value in result.get('counts', {}).items()})
+        rows.append(row)
+
+    return pd.DataFrame.from_records(rows, columns=None if rows else ["REQ Num", "path", "match", "note"])
+
+def write_results(results: Iterable[Union[dict, CheckResult]], path: str,
+                  file_format: Union[str, None] = None) -> pd.DataFrame:
+    '''
+    Write the results of a whole run in one call as Parquet, Feather or CSV (see `results_to_frame`)
+    Parquet and Feather need the optional dependency pyarrow (`pip install cosmicexcelchecker[arrow]`)
+
+    :param results: "results" of `check_all_files`, in dict-format or CheckResult
+    :param path: path of the output file
+    :param file_format: '.parquet', '.feather' or '.csv', default to None (by the extension of path)
+    :return: the written pd.DataFrame
+    '''
+
+    file_format = _file_format(path=path, file_format=file_format)
+    frame = results_to_frame(results)
+
+    if file_format == '.csv':
+        frame.to_csv(path, index=False, encoding='utf-8')
+        return frame
+
+    _require_pyarrow(file_format=file_format)
+    if file_format == '.parquet':
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_feather(path)
+
+    return frame
+
+def read_results(path: str, file_format: Union[str, None] = None) -> pd.DataFrame:
+    '''
+    Load results written by `write_results`, e.g. to compare runs over time
+
+    :param path: path of the file
+    :param file_format: '.parquet', '.feather' or '.csv', default to None (by the extension of path)
+    :return: pd.DataFrame
+    '''
+
+    file_format = _file_format(path=path, file_format=file_format)
+
+    if file_format == '.csv':
+        # empty cells are missing numbers, but empty text of clean rows stays ''
+        frame = pd.read_csv(path, encoding='utf-8', keep_default_na=False, na_values=[''])
+        for column in TEXT_COLUMNS:
+            if column in frame.columns:
+                frame[column] = frame[column].fillna('').astype(str)
+        return frame
+
+    _require_pyarrow(file_format=file_format)
+    if file_format == '.parquet':
+        return pd.read_parquet(path)
+    return pd.read_feather(path)
+
+def write_annotated_summary(result_summary: 'ResultSummary', results: Iterable[Union[dict, CheckResult]],
+                            path: str) -> None:
+    '''
+    Write a copy of the checked result summary with "match" and "note" columns added after the last column
+    of the checked sheet. An .xlsx summary is copied as a whole with openpyxl, so the title rows above the
+    header, other sheets and formatting are kept. An .xls summary cannot be opened by openpyxl, then only the
+    data table of the checked sheet is written (values only, streamed with openpyxl write-only mode)
+
+    :param result_summary: the ResultSummary that was checked, its sheet has to be loaded
+    :param results: "results" of `check_all_files` of the same sheet, one per row in the same order
+    :param path: path of the output .xlsx file
+    :return: None
+    '''
+
+    if not path.endswith('.xlsx'):
+        raise IncorrectFileTypeException(f"{path} is not a valid file path for the annotated summary. It has to be .xlsx file")
+
+    df = result_summary.data_frame_specific
+    if df is None:
+        raise CosmicExcelCheckerException("Specific worksheet is not loaded. Use `set_sheet_name` to load it")
+
+    results = [result.to_dict() if isinstance(result, CheckResult) else result for result in results]
+    if len(results) != len(df.index):
+        raise ValueError(f"Got {len(results)} results for {len(df.index)} rows, "
+                         f"results have to come from `check_all_files` of sheet {result_summary.sheet_name}")
+
+    annotations = [[result.get('match'), result.get('note')] if result
+                   else [None, "Not checked (unknown or repeated requirement number)"] for result in results]
+
+    if result_summary.path.endswith('.xlsx'):
+        _write_annotated_copy(result_summary=result_summary, annotations=annotations, path=path)
+    else:
+        _write_annotated_table(result_summary=result_summary, annotations=annotations, path=path)
+
+def _write_annotated_copy(result_summary: 'ResultSummary', annotations: list[list], path: str) -> None:
+    book = openpyxl.load_workbook(result_summary.path)
+    try:
+        sheet = book[result_summary.sheet_name]
+        column = sheet.max_column + 1
+        header_row = RS_SKIP_ROWS + 1  # rows above the header were skipped when the sheet was loaded
+
+        sheet.cell(row=header_row, column=column, value='match')
+        sheet.cell(row=header_row, column=column + 1, value='note')
+        for row, (match, note) in enumerate(annotations, start=header_row + 1):
+            sheet.cell(row=row, column=column, value=match)
+            sheet.cell(row=row, column=column + 1, value=note)
+
+        book.save(path)
+    finally:
+        book.close()
+
+def _write_annotated_table(result_summary: 'ResultSummary', annotations: list[list], path: str) -> None:
+    df = result_summary.data_frame_specific
+
+    book = Workbook(write_only=True)
+    sheet = book.create_sheet(title=result_summary.sheet_name[:31])  # longest sheet name allowed by Excel
+    sheet.append([str(column) for column in df.columns] + ['match', 'note'])
+
+    values = df.astype(object).where(df.notna(), None)
+    for row, annotation in zip(values.itertuples(index=False, name=None), annotations):
+        sheet.append(list(row) + annotation)
+
+    book.save(path)
+
+def _file_format(path: str, file_format: Union[str, None]) -> str:
+    if file_format is None:
+        file_format = path[path.rindex('.'):].lower() if '.' in path else ''
+
+    if file_format not in RESULT_FORMATS:
+        raise IncorrectFileTypeException(f"{path} is not a valid file path for results. "
+                                         f"It has to be one of {', '.join(RESULT_FORMATS)}")
+
+    return file_format
+
+def _require_pyarrow(file_format: str) -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError(f"{file_format} files require pyarrow, "
+                          f"install it with `pip install cosmicexcelchecker[arrow]` or `pip install pyarrow`") from e
@@ -1,8 +1,37 @@
 # This file is used to find possible files by requirement
 
 from cosmicexcelchecker._baseclass import UnionExcels
+from cosmicexcelchecker.conf import SR_SUBFOLDER_NAME, SR_COSMIC_FILE_PREFIX, SR_NONCOSMIC_FILE_PREFIX
 
-import glob
+from typing import NamedTuple, Union, Dict, List, Iterator
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import os
+import json
+import time
+import tempfile
+
+class ReqFile(NamedTuple):
+    '''
+    A single requirement Excel file found under the folders path
+    kind is 'cosmic' or 'noncosmic' by the filename prefix, None if neither of them
+    in_subfolder is True if the file is directly under the SR_SUBFOLDER_NAME folder
+    '''
+
+    path: str
+    kind: Union[str, None]
+    in_subfolder: bool
+
+class IndexedFile(NamedTuple):
+    '''
+    A single Excel file recorded in a FileIndex
+    req_num is the name of the top folder under the folders path, None if the file is directly under it
+    '''
+
+    path: str
+    mtime_ns: int
+    size: int
+    req_num: Union[str, None]
 
 class FindExcels(UnionExcels):
     '''
@@ -15,16 +44,330 @@ class FindExcels(UnionExcels):
         return path.replace('\\', '/').strip()
 
     @staticmethod
-    def find_excels(path: str) -> list[str, None]:
+    def find_excels(path: str, max_workers: int = 1, subfolder_only: bool = False) -> list[str, None]:
+        '''
+        find all possible Excel files under path, see `iter_excels`
+
+        :param path: relative path for searching files
+        :param max_workers: number of threads to walk sub-folders in parallel, default to 1 (no thread pool)
+        :param subfolder_only: bool for whether only finding files directly under SR_SUBFOLDER_NAME folders
+        :return: list of all Excel fils name (path) or list of 0 element if no files qualified
+        '''
+
+        return list(FindExcels.iter_excels(path=path, max_workers=max_workers, subfolder_only=subfolder_only))
+
+    @staticmethod
+    def iter_excels(path: str, max_workers: int = 1, subfolder_only: bool = False,
+                    ordered: bool = True) -> Iterator[str]:
+        '''
+        Lazily find all possible Excel files (.xlsx, .xls, .csv) under path with os.scandir.
+        Files are filtered by extension from the directory listing, so non-Excel files are never stat-ed.
+        Hidden files and folders (starting with '.') are skipped like glob does.
+        With the default ordered=True, paths are yielded in the same order as a recursive glob:
+        files of a folder first, then each sub-folder depth first.
+
+        :param path: relative path for searching files
+        :param max_workers: number of threads to walk sub-folders in parallel, default to 1 (no thread pool)
+        :param subfolder_only: bool for whether only finding files directly under SR_SUBFOLDER_NAME folders,
+        folders inside SR_SUBFOLDER_NAME are not walked in this case
+        :param ordered: bool for whether keeping the glob order when walking in parallel, default to True.
+        If False, files of a folder are yielded as soon as the folder is listed
+        :return: iterator of Excel file paths
+        '''
+
+        path = FindExcels._root_path(path=path)
+
+        if max_workers is None or max_workers <= 1:
+            stack : list[str] = [path]
+            while stack:
+                files, folders = FindExcels._scan_folder(path=stack.pop(), subfolder_only=subfolder_only)
+                yield from files
+                stack.extend(reversed(folders))  # depth first, first folder on top
+            return
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending : dict = {executor.submit(FindExcels._scan_folder, path, subfolder_only): path}
+            scanned : Dict[str, tuple] = {}
+            stack : list[str] = [path]  # folders not yielded yet, in glob order
+
+            while pending or stack:
+                # yield every folder whose turn has come and is already listed
+                while ordered and stack and stack[-1] in scanned:
+                    files, folders = scanned.pop(stack.pop())
+                    yield from files
+                    stack.extend(reversed(folders))
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    folder_path = pending.pop(future)
+                    files, folders = future.result()
+
+                    # walk sub-folders right away, they do not wait for their turn to be yielded
+                    for folder in folders:
+                        pending[executor.submit(FindExcels._scan_folder, folder, subfolder_only)] = folder
+
+                    if ordered:
+                        scanned[folder_path] = (files, folders)
+                    else:
+                        yield from files
+
+    @staticmethod
+    def _root_path(path: str) -> str:
+        # folders path without trailing '/' (or the old glob pattern suffix)
         path = FindExcels.path_format(path=path)
 
-        if not path.endswith('/**/*'):
-            path += '/**/*'  # to iterate all files
+        if path.endswith('/**/*'):
+            path = path[:-len('/**/*')]
+        if len(path) > 1:
+            path = path.rstrip('/')
+
+        return path
+
+    @staticmethod
+    def _scan_folder(path: str, subfolder_only: bool = False) -> tuple[list[str], list[str]]:
+        '''
+        List a single folder
+
+        :return: (Excel file paths, sub-folder paths) in the order of os.scandir
+        '''
+
+        files : list[str] = []
+        folders : list[str] = []
+
+        in_subfolder = path.rsplit('/', 1)[-1] == SR_SUBFOLDER_NAME
+        prefix = path if path.endswith('/') else path + '/'
+
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+
+                    try:
+                        is_dir = entry.is_dir()  # no stat call on most platforms
+                    except OSError:
+                        continue
+
+                    if is_dir:
+                        if not (subfolder_only and in_subfolder):
+                            folders.append(prefix + entry.name)
+                    elif entry.name.endswith(('.xlsx', '.xls', '.csv')) and (in_subfolder or not subfolder_only):
+                        files.append(prefix + entry.name)
+        except OSError:  # not readable, ignored like glob does
+            pass
+
+        return files, folders
+
+    @staticmethod
+    def index_excels(path: str, file_paths: list[str, None]) -> Dict[str, List[ReqFile]]:
+        '''
+        Build an index of Excel files keyed by requirement folder name
+        A file is listed under every folder name between path and the file, so a requirement folder
+        can be nested at any depth. Files keep the order of file_paths under each key.
+
+        :param path: the folders path that file_paths were found under
+        :param file_paths: list of file paths, e.g. output of `find_excels`
+        :return: dict of {folder name (requirement number as str): list of ReqFile}
+        '''
+
+        prefix = FindExcels.path_format(path=path).rstrip('/') + '/'
+
+        index : Dict[str, List[ReqFile]] = {}
+        for file_path in file_paths:
+            if not file_path.startswith(prefix):
+                continue
+
+            *folders, filename = file_path[len(prefix):].split('/')
+
+            if filename.startswith(SR_COSMIC_FILE_PREFIX):
+                kind = 'cosmic'
+            elif filename.startswith(SR_NONCOSMIC_FILE_PREFIX):
+                kind = 'noncosmic'
+            else:
+                kind = None
+
+            req_file = ReqFile(path=file_path, kind=kind, in_subfolder=len(folders) > 0 and folders[-1] == SR_SUBFOLDER_NAME)
+            for folder in dict.fromkeys(folders):  # unique folder names, order kept
+                index.setdefault(folder, []).append(req_file)
+
+        return index
+
+class FileIndex:
+    '''
+    Persisted index of all possible Excel files under a folders path
+    Every folder is stored with its mtime, its Excel files (name, mtime, size) and its sub-folders.
+    `refresh` only lists again the folders whose mtime changed, unchanged folders cost a single stat call.
+    Note a folder mtime changes when files are added, removed or renamed in it, not when a file is modified,
+    so mtime and size of a file are the ones seen when its folder was last listed.
+    '''
+
+    VERSION : int = 1
+    RACY_NS : int = 2 * 10 ** 9  # folders modified this recently are listed again on next refresh
+
+    def __init__(self, path: str, index_path: Union[str, None] = None):
+        '''
+        :param path: the folders path to index
+        :param index_path: JSON file to persist the index, loaded if it exists. Default to None (in memory only)
+        '''
+
+        self.path : str = FindExcels._root_path(path=path)
+        self.index_path : Union[str, None] = index_path
+        self.folders : Dict[str, dict] = {}  # {relative folder path: {'mtime_ns', 'files', 'folders'}}
+        self.rescanned : List[str] = []  # relative folder paths listed by the last refresh
+
+        if self.index_path is not None:
+            self.load()
+
+    def _full_path(self, rel_path: str) -> str:
+        if not rel_path:
+            return self.path
+        return (self.path if self.path.endswith('/') else self.path + '/') + rel_path
+
+    def load(self) -> bool:
+        '''
+        Load the index from index_path, an index of another folders path or version is ignored
+
+        :return: bool for whether the index is loaded
+        '''
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict) or data.get('version') != FileIndex.VERSION \
+                or data.get('path') != os.path.abspath(self.path):
+            return False
+
+        self.folders = data['folders']
+        return True
+
+    def save(self) -> None:
+        '''
+        Write the index to index_path atomically
+
+        :return: None
+        '''
+
+        data = {'version': FileIndex.VERSION, 'path': os.path.abspath(self.path), 'folders': self.folders}
+
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def refresh(self) -> int:
+        '''
+        Revalidate the index by folder mtimes and list again only the changed folders
+        The index is saved to index_path if anything changed
+
+        :return: number of folders listed again
+        '''
+
+        folders : Dict[str, dict] = {}
+        self.rescanned = []
+        now = time.time_ns()
+
+        stack : list[str] = ['']
+        while stack:
+            rel_path = stack.pop()
+            full_path = self._full_path(rel_path)
+
+            try:
+                mtime_ns = os.stat(full_path).st_mtime_ns
+            except OSError:  # removed or not readable
+                continue
+
+            folder = self.folders.get(rel_path)
+            if folder is None or folder['mtime_ns'] != mtime_ns:
+                files, sub_folders = FileIndex._scan_folder(path=full_path)
+                # a folder changed within the mtime resolution could change again unnoticed
+                folder = {'mtime_ns': mtime_ns if now - mtime_ns > FileIndex.RACY_NS else -1,
+                          'files': files, 'folders': sub_folders}
+                self.rescanned.append(rel_path)
+
+            folders[rel_path] = folder
+            prefix = rel_path + '/' if rel_path else ''
+            stack.extend(prefix + name for name in reversed(folder['folders']))
+
+        changed = bool(self.rescanned) or folders.keys() != self.folders.keys()
+        self.folders = folders
+
+        if changed and self.index_path is not None:
+            self.save()
+
+        return len(self.rescanned)
+
+    @staticmethod
+    def _scan_folder(path: str) -> tuple[list[list], list[str]]:
+        # list a single folder: ([name, mtime_ns, size] of Excel files, sub-folder names)
+        files : list[list] = []
+        folders : list[str] = []
+
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+
+                    try:
+                        if entry.is_dir():
+                            folders.append(entry.name)
+                        elif entry.name.endswith(('.xlsx', '.xls', '.csv')):
+                            stat = entry.stat()
+                            files.append([entry.name, stat.st_mtime_ns, stat.st_size])
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+
+        return files, folders
+
+    def iter_files(self) -> Iterator[IndexedFile]:
+        '''
+        Iterate the indexed files in the same order as `FindExcels.iter_excels`
+
+        :return: iterator of IndexedFile
+        '''
+
+        stack : list[str] = ['']
+        while stack:
+            rel_path = stack.pop()
+            folder = self.folders.get(rel_path)
+            if folder is None:
+                continue
+
+            full_path = self._full_path(rel_path)
+            prefix = full_path if full_path.endswith('/') else full_path + '/'
+            req_num = rel_path.split('/', 1)[0] if rel_path else None
+
+            for name, mtime_ns, size in folder['files']:
+                yield IndexedFile(path=prefix + name, mtime_ns=mtime_ns, size=size, req_num=req_num)
+
+            rel_prefix = rel_path + '/' if rel_path else ''
+            stack.extend(rel_prefix + name for name in reversed(folder['folders']))
+
+    @property
+    def file_paths(self) -> list[str]:
+        return [indexed_file.path for indexed_file in self.iter_files()]
+
+    def req_index(self) -> Dict[str, List[ReqFile]]:
+        '''
+        Index of the files keyed by requirement folder name, see `FindExcels.index_excels`
 
-        # using glob for recursive searching
-        excels : list[str, None] = []
-        for filename in glob.iglob(pathname=path, recursive=True):
-            if filename.endswith(('.xlsx', '.xls', '.csv')):
-                excels.append(filename.replace('\\', '/'))
+        :return: dict of {folder name (requirement number as str): list of ReqFile}
+        '''
 
-        return excels
\ No newline at end of file
+        return FindExcels.index_excels(path=self.path, file_paths=self.file_paths)
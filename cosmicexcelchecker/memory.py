@@ -0,0 +1,110 @@
+# Resident memory of the running process, used by the memory-bounded mode of check_all_files
+
+from typing import Union
+
+import os
+import sys
+
+def current_rss() -> Union[int, None]:
+    '''
+    Resident set size (RSS) of the current process in bytes
+    Read from /proc/self/statm on Linux and GetProcessMemoryInfo on Windows. Elsewhere the peak RSS of
+    `resource.getrusage` is used, which never goes down
+
+    :return: RSS in bytes, or None if it cannot be read on this platform
+    '''
+
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    if sys.platform == 'win32':
+        return _windows_rss()
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024  # bytes on macOS, KiB elsewhere
+
+def _windows_rss() -> Union[int, None]:
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        get_process_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+        get_process_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+        if not get_process_memory_info(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters),
+                                       counters.cb):
+            return None
+    except (AttributeError, OSError):
+        return None
+
+    return counters.WorkingSetSize
+
+class MemoryMonitor:
+    '''
+    Sample the RSS of the current process against a budget and keep the peak seen during a run
+    Samples are taken between checks, so short spikes inside a single check may be missed
+    '''
+
+    def __init__(self, budget: Union[int, None] = None):
+        '''
+        :param budget: RSS budget in bytes, default to None (only track the peak)
+        '''
+
+        self.budget : Union[int, None] = budget
+        self.peak : Union[int, None] = None
+
+    def sample(self) -> Union[int, None]:
+        '''
+        Read the current RSS and update the peak
+
+        :return: RSS in bytes, or None if it cannot be read
+        '''
+
+        rss = current_rss()
+        self.observe(rss)
+        return rss
+
+    def observe(self, rss: Union[int, None]) -> None:
+        '''
+        Update the peak with a RSS measured elsewhere, e.g. in a worker process
+
+        :param rss: RSS in bytes, None is ignored
+        :return: None
+        '''
+
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def over_budget(self) -> bool:
+        '''
+        Sample the RSS and tell whether it is over the budget
+
+        :return: False if there is no budget or RSS cannot be read
+        '''
+
+        rss = self.sample()
+        return self.budget is not None and rss is not None and rss > self.budget
+
@@ -3,6 +3,9 @@
 from cosmicexcelchecker._baseclass import AbstractObf
 
 from typing import Union
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 class CheckObf(AbstractObf):
     '''
@@ -17,35 +20,143 @@ class CheckObf(AbstractObf):
         Use the Levenshtein distance algorithem, which allows edit, add, delete
         Calculate the step numbers
 
+        The distance is computed by the bit-parallel algorithm of Myers (Hyyro's variant for Levenshtein distance),
+        the shorter string is kept as bit vectors (python int) and each char of the longer one costs a few
+        bit operations, instead of a row of the (len1 + 1) * (len2 + 1) dp matrix
+
+        :param string1: a string input
+        :param string2: another string input
+        :return: step numbers as int
+        '''
+
+        return CheckObf._myers(string1=string1, string2=string2)
+
+    @staticmethod
+    def compare_bounded(string1: str, string2: str, max_distance: int) -> int:
+        '''
+        Compare the edit distance of two given strings, but only if it is not greater than max_distance.
+        It stops as soon as the distance is known to be greater than max_distance.
+        A narrow band (compared to the string length) uses the banded dp with two rows of memory,
+        otherwise the bit-parallel algorithm of `compare` is used with the same early exit
+
         :param string1: a string input
         :param string2: another string input
+        :param max_distance: the largest distance of interest
+        :return: step numbers as int, or max_distance + 1 if the distance is greater than max_distance
+        '''
+
+        if max_distance < 0:
+            return max_distance + 1
+
+        if abs(len(string1) - len(string2)) > max_distance:  # length difference alone is too large
+            return max_distance + 1
+
+        # the banded dp costs (2 * max_distance + 1) steps per char in pure python,
+        # it is only faster than bit-parallel for very long strings with a small distance allowed
+        if (2 * max_distance + 1) * 1024 <= min(len(string1), len(string2)):
+            return CheckObf._banded(string1=string1, string2=string2, max_distance=max_distance)
+
+        return CheckObf._myers(string1=string1, string2=string2, max_distance=max_distance)
+
+    @staticmethod
+    def _myers(string1: str, string2: str, max_distance: Union[int, None] = None) -> int:
+        '''
+        Bit-parallel Levenshtein distance (Myers 1999, Hyyro 2001)
+
+        :param max_distance: stop early and return max_distance + 1 if the distance is greater, default to None
         :return: step numbers as int
         '''
 
-        # use var to get string1 + 1and string2 length + 1 since a lot of usage later
-        len_str1_add1 = len(string1) + 1
-        len_str2_add1 = len(string2) + 1
+        # shorter string as pattern, so bit vectors are as short as possible
+        pattern, text = (string1, string2) if len(string1) <= len(string2) else (string2, string1)
+
+        len_pattern = len(pattern)
+        if len_pattern == 0:
+            return len(text) if max_distance is None else min(len(text), max_distance + 1)
+
+        # bit mask of positions in pattern for each char
+        peq : dict[str, int] = {}
+        for i, char in enumerate(pattern):
+            peq[char] = peq.get(char, 0) | (1 << i)
+
+        full_mask = (1 << len_pattern) - 1
+        last_bit = 1 << (len_pattern - 1)
+        pv = full_mask  # positive vertical delta
+        mv = 0  # negative vertical delta
+        score = len_pattern
+        remaining = len(text)
+
+        for char in text:
+            eq = peq.get(char, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)  # positive horizontal delta
+            mh = pv & xh  # negative horizontal delta
+
+            if ph & last_bit:
+                score += 1
+            elif mh & last_bit:
+                score -= 1
+
+            # each remaining char can lower the score by 1 at most
+            remaining -= 1
+            if max_distance is not None and score - remaining > max_distance:
+                return max_distance + 1
+
+            ph = (ph << 1) | 1
+            mh = mh << 1
+            pv = (mh | ~(xv | ph)) & full_mask
+            mv = ph & xv & full_mask
+
+        return score if max_distance is None else min(score, max_distance + 1)
+
+    @staticmethod
+    def _banded(string1: str, string2: str, max_distance: int) -> int:
+        '''
+        Banded Levenshtein distance (Ukkonen). Only the diagonal band of width 2 * max_distance + 1 of the dp
+        matrix is computed with two rows of memory, and it stops as soon as a whole row is greater than max_distance
+
+        :return: step numbers as int, or max_distance + 1 if the distance is greater than max_distance
+        '''
+
+        short, long = (string1, string2) if len(string1) <= len(string2) else (string2, string1)
+        len_short, len_long = len(short), len(long)
+        out_of_band = max_distance + 1
+
+        if len_long - len_short > max_distance:
+            return out_of_band
 
-        # create mem space for dp, 1D array for performance but think as 2d array
-        len_dp_mem = len_str1_add1 * len_str2_add1
-        dp_mem = [0 for _ in range(len_dp_mem)]
+        if len_short == 0:
+            return len_long
 
-        # generate for (a_i, 0) and (0, b_j) cells
-        for i in range(len_str1_add1):
-            dp_mem[i] = i
+        prev_row = [j if j <= max_distance else out_of_band for j in range(len_long + 1)]
+        cur_row = [out_of_band] * (len_long + 1)
 
-        for j in range(0, len_dp_mem, len_str1_add1):
-            dp_mem[j] = j // len_str1_add1
+        for i in range(1, len_short + 1):
+            low = max(1, i - max_distance)
+            high = min(len_long, i + max_distance)
 
-        # iterate through each cell, check the min based on 3 ways (see levenshtein distance formula)
-        for i in range(1, len_dp_mem):  # skip first zero to improve perf
-            if dp_mem[i] != 0:  # first line or first col in 2D
-                continue
+            # left of the band, also clears the value left by the row before the previous one
+            cur_row[low - 1] = i if low == 1 and i <= max_distance else out_of_band
 
-            dp_mem[i] = min(dp_mem[i - 1] + 1, dp_mem[i - len_str1_add1] + 1, dp_mem[i - len_str1_add1 - 1] + \
-                int(string1[i % len_str1_add1 - 1] != string2[i // len_str1_add1 - 1]))
+            char = short[i - 1]
+            row_min = out_of_band
+            for j in range(low, high + 1):
+                value = min(prev_row[j] + 1, cur_row[j - 1] + 1, prev_row[j - 1] + (char != long[j - 1]))
+                cur_row[j] = value
 
-        return dp_mem[-1]  # return the bottom right if in 2D
+                if value < row_min:
+                    row_min = value
+
+            if row_min > max_distance:  # early exit, distance can only grow from now on
+                return out_of_band
+
+            if high < len_long:  # right of the band for the next row
+                cur_row[high + 1] = out_of_band
+
+            prev_row, cur_row = cur_row, prev_row
+
+        return min(prev_row[len_long], out_of_band)
 
     @staticmethod
     def similarity(string1: str, string2: str, ratio: Union[float, None] = None) -> Union[float, bool]:
@@ -55,6 +166,7 @@ class CheckObf(AbstractObf):
 
         If ratio provided,
         If greater than ratio, means similar. Otherwise, it's not
+        Only the distance allowed by the ratio is computed (see `compare_bounded`), so dissimilar strings stop early
 
         :param string1: First string input
         :param string2: Second string input
@@ -62,12 +174,234 @@ class CheckObf(AbstractObf):
         :return: similar float ratio if no ratio param. Otherwise, True if similar, False if not similar by comparing the ratio
         '''
 
-        ed : int = CheckObf.compare(string1=string1, string2=string2)
+        longer = max(len(string1), len(string2))
 
         if ratio:
-            return (max(len(string1), len(string2)) - ed) / max(len(string1), len(string2)) >= ratio
+            max_distance = CheckObf.max_distance(length=longer, ratio=ratio)
+            ed : int = CheckObf.compare_bounded(string1=string1, string2=string2, max_distance=max_distance)
+
+            return (longer - ed) / longer >= ratio
+
+        ed : int = CheckObf.compare(string1=string1, string2=string2)
+
+        return 1 - ed / longer
+
+    @staticmethod
+    def max_distance(length: int, ratio: float) -> int:
+        '''
+        The largest edit distance k that still satisfies "(length - k) / length >= ratio"
+
+        :param length: length of the longer string
+        :param ratio: Given ratio to compare
+        :return: the distance as int, -1 if even equal strings do not satisfy the ratio
+        '''
+
+        k = int(length * (1 - ratio))
 
-        return 1 - ed / max(len(string1), len(string2))
+        # correct float rounding of the estimate with the exact formula used by `similarity`
+        while k >= 0 and (length - k) / length < ratio:
+            k -= 1
+        while k + 1 <= length and (length - k - 1) / length >= ratio:
+            k += 1
 
+        return k
+
+    @staticmethod
+    def compare_matrix(strings1: list[str], strings2: list[str], max_workers: int = 1) -> np.ndarray:
+        '''
+        Compare the edit distance of every pair of strings from two lists at once, with NumPy.
+        Strings are converted to padded code point arrays and the dp runs over all pairs of a block of
+        strings1 and all of strings2 together, one step per char of the longest string in the block.
+        Inside a row, the insertion dependency is solved by a cumulative minimum, so there is no python loop
+        over the columns.
+
+        :param strings1: list of strings, rows of the result
+        :param strings2: list of strings, columns of the result
+        :param max_workers: number of worker processes to split rows, default to 1 (no pool)
+        :return: int matrix of shape (len(strings1), len(strings2)) with edit distances
+        '''
+
+        if max_workers is None or max_workers > 1:
+            workers = max_workers or 1
+            step = -(-len(strings1) // workers) if workers > 1 else len(strings1)
+
+            if workers > 1 and len(strings1) > 1:
+                blocks = [strings1[i:i + step] for i in range(0, len(strings1), step)]
+                with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as executor:
+                    results = list(executor.map(CheckObf._compare_block, blocks, [strings2] * len(blocks)))
+
+                return np.concatenate(results, axis=0) if results else np.zeros((0, len(strings2)), dtype=np.int32)
+
+        return CheckObf._compare_block(strings1=strings1, strings2=strings2)
+
+    @staticmethod
+    def similarity_matrix(strings1: list[str], strings2: list[str], max_workers: int = 1) -> np.ndarray:
+        '''
+        Similarity ratio ("(longer - compare()) / longer", same as `similarity`) of every pair of strings
+        from two lists, computed by `compare_matrix`. Two empty strings count as ratio 1.0
+
+        :param strings1: list of strings, rows of the result
+        :param strings2: list of strings, columns of the result
+        :param max_workers: number of worker processes to split rows, default to 1 (no pool)
+        :return: float matrix of shape (len(strings1), len(strings2)) with similarity ratios
+        '''
+
+        distances = CheckObf.compare_matrix(strings1=strings1, strings2=strings2, max_workers=max_workers)
+
+        longer = np.maximum(np.fromiter((len(string) for string in strings1), dtype=np.int64, count=len(strings1))[:, None],
+                            np.fromiter((len(string) for string in strings2), dtype=np.int64, count=len(strings2))[None, :])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(longer > 0, 1 - distances / longer, 1.0)
+
+    @staticmethod
+    def _compare_block(strings1: list[str], strings2: list[str], max_cells: int = 1 << 22) -> np.ndarray:
+        '''
+        Vectorized dp of `compare_matrix` for all pairs of strings1 and strings2
+
+        :param max_cells: max number of dp cells in memory at a time, rows of strings1 are processed in chunks
+        :return: int matrix of edit distances
+        '''
+
+        len1 = np.fromiter((len(string) for string in strings1), dtype=np.int64, count=len(strings1))
+        len2 = np.fromiter((len(string) for string in strings2), dtype=np.int64, count=len(strings2))
+        distances = np.zeros((len(strings1), len(strings2)), dtype=np.int32)
+
+        if len(strings1) == 0 or len(strings2) == 0:
+            return distances
+
+        # code points of strings2, padded with -1 which never equals a char
+        width2 = int(len2.max())
+        codes2 = np.full((len(strings2), width2), -1, dtype=np.int32)
+        for idx, string in enumerate(strings2):
+            codes2[idx, :len(string)] = [ord(char) for char in string]
+
+        # distances are never greater than the longer length, use the smallest dtype that holds them
+        dtype = np.int16 if int(len1.max()) + width2 < np.iinfo(np.int16).max else np.int32
+        offsets = np.arange(width2 + 1, dtype=dtype)
+        cols = np.arange(len(strings2))
+        chunk = max(1, max_cells // (len(strings2) * (width2 + 1)))
+
+        # rows sorted by length, so strings in a chunk need about the same number of dp steps
+        order = np.argsort(len1, kind='stable')
+
+        for start in range(0, len(strings1), chunk):
+            rows = order[start:start + chunk]
+            block_len = len1[rows]
+            width1 = int(block_len.max())
+
+            # code points of the block, padded with -2 which never equals a char or a padding of strings2
+            codes1 = np.full((len(rows), width1), -2, dtype=np.int32)
+            for idx, row_idx in enumerate(rows):
+                codes1[idx, :block_len[idx]] = [ord(char) for char in strings1[row_idx]]
+
+            # first row of dp: distance to the empty prefix
+            prev_row = np.broadcast_to(offsets, (len(rows), len(strings2), width2 + 1)).copy()
+            row = np.empty_like(prev_row)
+
+            finished = np.nonzero(block_len == 0)[0]
+            distances[rows[finished]] = len2
+
+            for i in range(1, width1 + 1):
+                cost = codes2[None, :, :] != codes1[:, i - 1, None, None]  # substitution cost
+
+                row[:, :, 0] = i
+                np.minimum(prev_row[:, :, 1:] + 1, prev_row[:, :, :-1] + cost, out=row[:, :, 1:])
+
+                # insertion: row[j] = min over k <= j of (row[k] + j - k), a cumulative minimum after shifting
+                row -= offsets
+                np.minimum.accumulate(row, axis=2, out=row)
+                row += offsets
+
+                prev_row, row = row, prev_row
+
+                finished = np.nonzero(block_len == i)[0]
+                if len(finished) > 0:
+                    distances[rows[finished]] = prev_row[finished][:, cols, len2]
+
+        return distances
+
+    @staticmethod
+    def match(queries: list[str], candidates: list[str], ratio: float, limit: int = 1,
+              q: int = 2) -> list[list[tuple[int, float]]]:
+        '''
+        Find the most similar candidates of every query string, with similarity not less than ratio
+        (same formula as `similarity`). Pairs are filtered before computing any distance:
+        candidates are bucketed by length, so only lengths within the allowed distance are looked at,
+        and an inverted index of q-grams counts the q-grams shared with the query, since two strings within
+        distance k share at least max(len1, len2) - q + 1 - k * q q-grams. Remaining pairs are verified by
+        `compare_bounded`.
+
+        :param queries: list of strings to search for
+        :param candidates: list of strings to search in
+        :param ratio: Given ratio to compare
+        :param limit: max number of matches for each query, default to 1 (only the best match)
+        :param q: length of q-grams for the filter, default to 2 (bigram, suitable for chinese names)
+        :return: for each query, a list of (index in candidates, similarity) sorted by similarity descending
+        '''
+
+        # length buckets and q-gram inverted index of candidates
+        length_buckets : dict[int, list[int]] = {}
+        qgram_index : dict[str, list[tuple[int, int]]] = {}
+        for idx, candidate in enumerate(candidates):
+            length_buckets.setdefault(len(candidate), []).append(idx)
+            for gram, count in CheckObf._qgrams(string=candidate, q=q).items():
+                qgram_index.setdefault(gram, []).append((idx, count))
+
+        max_len = max(length_buckets, default=0)
+
+        results : list[list[tuple[int, float]]] = []
+        for query in queries:
+            len_query = len(query)
+
+            # candidates not longer than query differ at most by the distance allowed for query length,
+            # longer candidates are at most len_query / ratio long
+            low = len_query - CheckObf.max_distance(length=len_query, ratio=ratio) if len_query > 0 else 0
+            high = min(max_len, int(len_query / ratio) + 1) if ratio > 0 else max_len
+
+            # q-grams shared with query, only counted for candidates having at least one of them
+            shared : dict[int, int] = {}
+            for gram, count in CheckObf._qgrams(string=query, q=q).items():
+                for idx, candidate_count in qgram_index.get(gram, ()):
+                    shared[idx] = shared.get(idx, 0) + min(count, candidate_count)
+
+            matches : list[tuple[int, float]] = []
+            for len_candidate in range(max(low, 0), high + 1):
+                longer = max(len_query, len_candidate)
+
+                if longer == 0:  # both empty
+                    matches.extend((idx, 1.0) for idx in length_buckets.get(len_candidate, ()))
+                    continue
+
+                max_distance = CheckObf.max_distance(length=longer, ratio=ratio)
+                if max_distance < 0 or abs(len_query - len_candidate) > max_distance:
+                    continue
+
+                min_shared = longer - q + 1 - max_distance * q
+                for idx in length_buckets.get(len_candidate, ()):
+                    if min_shared > 0 and shared.get(idx, 0) < min_shared:
+                        continue
+
+                    ed = CheckObf.compare_bounded(string1=query, string2=candidates[idx], max_distance=max_distance)
+                    if ed <= max_distance:
+                        matches.append((idx, (longer - ed) / longer))
+
+            matches.sort(key=lambda match: (-match[1], match[0]))
+            results.append(matches[:limit])
+
+        return results
+
+    @staticmethod
+    def _qgrams(string: str, q: int) -> dict[str, int]:
+        '''
+        Count q-grams (substrings of length q) of a string
+
+        :return: dict of {q-gram: count}
+        '''
 
+        qgrams : dict[str, int] = {}
+        for i in range(len(string) - q + 1):
+            gram = string[i:i + q]
+            qgrams[gram] = qgrams.get(gram, 0) + 1
 
+        return qgrams
@@ -0,0 +1,194 @@
+# Structured results of requirement checks, an alternative to the dict-format results with text notes
+
+from typing import Union, Tuple, Iterable, NamedTuple
+from enum import IntEnum
+from array import array
+
+import numpy as np
+import pandas as pd
+
+class IssueKind(IntEnum):
+    '''
+    Kind of a problem found by `ResultSummary.check_file`
+    '''
+
+    COSMIC_REQ_NAME_MISMATCH = 1
+    CFP_TOTAL_MISMATCH = 2
+    CFP_TOTAL_INVALID = 3
+    COEFFICIENT_SHEET_MISSING = 4
+    COEFFICIENT_MISMATCH = 5
+    FINAL_CONFIRMATION = 6  # detail is the note of `check_final_confirmation`
+    HIGHLIGHT = 7  # rows and row_kinds hold the rows with a wrong CFP for their fill colour
+    NONCOSMIC_REQ_NAME_MISMATCH = 8
+    FOLDER_MISSING = 9
+    INCORRECT_FILE_TYPE = 10  # detail is the message of the requirement type
+    INCORRECT_FILE_COUNT = 11  # detail is the message of the requirement type
+    COLUMN_KEY_ERROR = 12
+    UNKNOWN_QUALIFIER = 13  # detail is the value of the qualified cosmic column
+
+class HighlightKind(IntEnum):
+    '''
+    Kind of a wrong row found by `CosmicReqExcel.check_highlight_cfp`
+    '''
+
+    MISSING_DATA = 1
+    CFP_NOT_A_NUMBER = 2
+    YELLOW_NOT_ZERO = 3
+    RED_NOT_ONE_THIRD = 4
+    NO_FILL_NOT_ONE = 5
+
+# text of the dict-format results
+ISSUE_NOTES : dict = {
+    IssueKind.COSMIC_REQ_NAME_MISMATCH: 'REQ name does not match (cosmic)',
+    IssueKind.CFP_TOTAL_MISMATCH: 'Total CFP points do not match (cosmic)',
+    IssueKind.CFP_TOTAL_INVALID: 'CFP points in Result Summary is not valid (cosmic)',
+    IssueKind.COEFFICIENT_SHEET_MISSING: 'No Coefficient Sheet in Excel (cosmic)',
+    IssueKind.COEFFICIENT_MISMATCH: 'Coefficient Sheet B1 data does not match total standard CFP pts',
+    IssueKind.NONCOSMIC_REQ_NAME_MISMATCH: 'REQ name does not match (noncosmic)',
+    IssueKind.FOLDER_MISSING: 'REQ folder does not exist',
+    IssueKind.COLUMN_KEY_ERROR: 'KeyError, Check column name',
+}
+
+HIGHLIGHT_NOTES : dict = {
+    HighlightKind.MISSING_DATA: 'Missing Data',
+    HighlightKind.CFP_NOT_A_NUMBER: 'CFP not a number',
+    HighlightKind.YELLOW_NOT_ZERO: 'Yellow != 0',
+    HighlightKind.RED_NOT_ONE_THIRD: 'Red != 1/3 or 0.333',
+    HighlightKind.NO_FILL_NOT_ONE: 'No fill (White) != 1',
+}
+
+class Issue(NamedTuple):
+    '''
+    A problem of a requirement, row numbers of highlight errors are kept in arrays instead of text
+    '''
+
+    kind: IssueKind
+    detail: str = ''
+    rows: Union[array, None] = None  # 1-based row numbers in the CFP sheet, HIGHLIGHT only
+    row_kinds: Union[array, None] = None  # HighlightKind of each row, HIGHLIGHT only
+
+    @property
+    def note(self) -> str:
+        # text of this issue in the dict-format result
+        if self.kind == IssueKind.HIGHLIGHT:
+            return f"highlight err: {str(highlight_messages(rows=self.rows, row_kinds=self.row_kinds))}"
+        if self.kind == IssueKind.UNKNOWN_QUALIFIER:
+            return f"The parameter {self.detail} is not accepted"
+        return self.detail or ISSUE_NOTES[self.kind]
+
+class CheckResult(NamedTuple):
+    '''
+    Result of `ResultSummary.check_file(as_record=True)`
+    mixed is True if both the cosmic and the non-cosmic file of a mixed requirement were checked
+    '''
+
+    req_num: object
+    path: str
+    issues: Tuple[Issue, ...] = ()
+    mixed: bool = False
+    stages: Union[dict, None] = None
+    counts: Union[dict, None] = None
+
+    @property
+    def match(self) -> bool:
+        return len(self.issues) == 0
+
+    @property
+    def note(self) -> str:
+        # same text as "note" of the dict-format result
+        if not self.mixed:
+            return _join_notes(self.issues)
+
+        cosmic_issues = [issue for issue in self.issues if issue.kind != IssueKind.NONCOSMIC_REQ_NAME_MISMATCH]
+        noncosmic_issues = [issue for issue in self.issues if issue.kind == IssueKind.NONCOSMIC_REQ_NAME_MISMATCH]
+        return (_join_notes(cosmic_issues) + '; ' + _join_notes(noncosmic_issues)).rstrip('; ')
+
+    def to_dict(self) -> dict:
+        '''
+        Convert to the dict-format result of `ResultSummary.check_file`
+
+        :return: dict with "REQ Num", "path", "match", "note" (and "stages", "counts" if profiled)
+        '''
+
+        result = {"REQ Num": self.req_num, "path": self.path, "match": self.match, "note": self.note}
+        if self.stages is not None:
+            result["stages"] = self.stages
+            result["counts"] = self.counts
+        return result
+
+def highlight_messages(rows: array, row_kinds: array) -> list[str]:
+    '''
+    Text of highlight errors, as returned by `CosmicReqExcel.check_highlight_cfp`
+
+    :param rows: row numbers
+    :param row_kinds: HighlightKind of each row
+    :return: list of strings such as '5 Yellow != 0'
+    '''
+
+    return [f'{row} {HIGHLIGHT_NOTES[row_kind]}' for row, row_kind in zip(rows, row_kinds)]
+
+def _join_notes(issues: Iterable[Issue]) -> str:
+    return ''.join(f'{issue.note}; ' for issue in issues).rstrip('; ')
+
+def records_to_frame(records: Iterable[CheckResult]) -> pd.DataFrame:
+    '''
+    One row per requirement: req_num, path, match, issue_count and one bool column per IssueKind
+    (lower case name, e.g. `highlight`), so results can be filtered and counted with vectorized operations
+
+    :param records: results of `check_file(as_record=True)`, empty dicts of unknown requirements are skipped
+    :return: pd.DataFrame
+    '''
+
+    records = [record for record in records if isinstance(record, CheckResult)]
+
+    masks = np.fromiter((sum(1 << int(kind) for kind in {issue.kind for issue in record.issues})
+                         for record in records), dtype=np.int64, count=len(records))
+
+    frame = pd.DataFrame({
+        "req_num": [record.req_num for record in records],
+        "path": [record.path for record in records],
+        "match": masks == 0,
+        "issue_count": np.fromiter((len(record.issues) for record in records), dtype=np.int64, count=len(records)),
+    })
+    for kind in IssueKind:
+        frame[kind.name.lower()] = (masks >> int(kind)) & 1 == 1
+
+    return frame
+
+def issues_to_frame(records: Iterable[CheckResult]) -> pd.DataFrame:
+    '''
+    One row per issue, highlight issues are expanded to one row per wrong CFP row
+
+    :param records: results of `check_file(as_record=True)`, empty dicts of unknown requirements are skipped
+    :return: pd.DataFrame with req_num, path, kind, detail, row (nullable int) and highlight (kind of the row)
+    '''
+
+    req_nums, paths, kinds, details, rows, highlights = [], [], [], [], [], []
+
+    for record in records:
+        if not isinstance(record, CheckResult):
+            continue
+
+        for issue in record.issues:
+            if issue.kind == IssueKind.HIGHLIGHT:
+                count = len(issue.rows)
+                rows.extend(issue.rows)
+                highlights.extend(HighlightKind(row_kind).name for row_kind in issue.row_kinds)
+            else:
+                count = 1
+                rows.append(None)
+                highlights.append(None)
+
+            req_nums.extend([record.req_num] * count)
+            paths.extend([record.path] * count)
+            kinds.extend([issue.kind.name] * count)
+            details.extend([issue.detail] * count)
+
+    return pd.DataFrame({
+        "req_num": req_nums,
+        "path": paths,
+        "kind": pd.Categorical(kinds, categories=[kind.name for kind in IssueKind]),
+        "detail": details,
+        "row": pd.array(rows, dtype='Int64'),
+        "highlight": pd.Categorical(highlights, categories=[kind.name for kind in HighlightKind]),
+    })
@@ -0,0 +1,119 @@
+# Per-stage timing of requirement checks
+
+from typing import Dict, List, Iterable
+
+import time
+import numpy as np
+
+class _Stage:
+    '''
+    Context manager adding the elapsed time of its block to a stage of a StageTimer
+    '''
+
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer: 'StageTimer', name: str):
+        self.timer = timer
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        stages = self.timer.stages
+        stages[self.name] = stages.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+class StageTimer:
+    '''
+    Collect wall time of named stages and counters (files, bytes, rows) of a single check
+    A stage entered several times (e.g. loading two files of a mixed requirement) adds up
+    '''
+
+    def __init__(self):
+        self.stages : Dict[str, float] = {}
+        self.counts : Dict[str, int] = {}
+
+    def stage(self, name: str) -> _Stage:
+        '''
+        Time a block: `with timer.stage('parse'): ...`
+
+        :param name: name of the stage
+        :return: context manager
+        '''
+
+        return _Stage(timer=self, name=name)
+
+    def count(self, name: str, value: int = 1) -> None:
+        '''
+        Add value to a counter
+
+        :param name: name of the counter
+        :param value: value to add, default to 1
+        :return: None
+        '''
+
+        self.counts[name] = self.counts.get(name, 0) + value
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+class NullTimer:
+    '''
+    Timer doing nothing, used when profiling is off so the checks need no branches
+    '''
+
+    _stage : _NullStage = _NullStage()
+
+    def stage(self, name: str) -> _NullStage:
+        return NullTimer._stage
+
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+NULL_TIMER : NullTimer = NullTimer()
+
+def summarize_stages(results: Iterable[dict], percentiles: Iterable[float] = (50, 90, 99)) -> dict:
+    '''
+    Aggregate "stages" and "counts" of profiled results (see `ResultSummary.check_file(profile=True)`)
+
+    :param results: results in dict-format or CheckResult, results without "stages" are skipped
+    :param percentiles: percentiles of stage time to report, default to (50, 90, 99)
+    :return: dict of {"stages": {stage: {"count", "total", "mean", "max", "p50", ...}}, "counts": {counter: total}}
+    '''
+
+    percentiles = tuple(percentiles)
+    stage_times : Dict[str, List[float]] = {}
+    counts : Dict[str, int] = {}
+
+    for result in results:
+        if not isinstance(result, dict):  # CheckResult
+            result = {'stages': result.stages or {}, 'counts': result.counts or {}}
+
+        for name, seconds in result.get('stages', {}).items():
+            stage_times.setdefault(name, []).append(seconds)
+        for name, value in result.get('counts', {}).items():
+            counts[name] = counts.get(name, 0) + value
+
+    stages : dict = {}
+    for name, times in stage_times.items():
+        values = np.asarray(times, dtype=float)
+        stage = {
+            "count": int(values.size),
+            "total": float(values.sum()),
+            "mean": float(values.mean()),
+            "max": float(values.max())
+        }
+        for q, value in zip(percentiles, np.percentile(values, percentiles)):
+            stage[f"p{q:g}"] = float(value)
+        stages[name] = stage
+
+    return {"stages": stages, "counts": counts}
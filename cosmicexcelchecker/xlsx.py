@@ -0,0 +1,351 @@
+# Read fill colours of a worksheet column straight from the .xlsx XML, without building openpyxl objects
+
+from typing import Union, Dict, List, IO, Tuple, Callable
+from xml.etree.ElementTree import iterparse, Element
+from xml.parsers import expat
+from array import array
+
+import posixpath
+import zipfile
+
+# fill colour codes of sub-process cells, stored one byte per row in `CosmicReqExcel.cfp_fills`
+FILL_SKIPPED = -1  # not counted since subprocess is empty
+FILL_NONE = 0
+FILL_YELLOW = 1
+FILL_RED = 2
+FILL_OTHER = 3
+
+def color_code(color_index: Union[str, int, None]) -> int:
+    '''
+    Fill code of a colour index as given by openpyxl (`Color.index`): rgb string, or indexed/theme int
+
+    :param color_index: rgb string such as 'FFFFFF00', indexed or theme colour int, None for no fill
+    :return: one of FILL_SKIPPED, FILL_NONE, FILL_YELLOW, FILL_RED, FILL_OTHER
+    '''
+
+    if color_index is None:
+        color_index = '00000000'
+
+    if color_index == "":  # not counted since subprocess is empty
+        return FILL_SKIPPED
+    elif color_index == 'FFFFFF00':
+        return FILL_YELLOW
+    elif color_index == 'FFFF0000':
+        return FILL_RED
+    elif color_index == '00000000' or (type(color_index) is int and color_index == 9):
+        return FILL_NONE
+    else:
+        return FILL_OTHER
+
+def read_column_fills(path: Union[str, IO[bytes]], sheet_name: str, column_name: str,
+                      max_rows: int) -> Union[array, None]:
+    '''
+    Read the fill colour code of every cell under a header in an .xlsx worksheet
+    styles.xml is parsed once into a {cell style: fill code} table, then the worksheet XML is streamed with expat
+    keeping only the `s=` attribute of cells in the column, so memory does not grow with the sheet.
+    Shared strings are only read as far as the header row needs.
+    Rows are handled like openpyxl read-only mode: cells without `s=` take cell style 0, missing cells count as
+    no fill, and rows after the last row of the sheet are not returned.
+
+    :param path: path to the .xlsx file or a binary file object
+    :param sheet_name: name of the worksheet
+    :param column_name: header (first row) of the column
+    :param max_rows: max number of rows after the header
+    :return: array of fill codes of rows 2, 3, ... or None if the sheet or column does not exist
+    '''
+
+    with zipfile.ZipFile(path) as archive:
+        workbook_path = _office_document_path(archive=archive)
+        workbook_rels = _relationships(archive=archive, part_path=workbook_path)
+
+        sheet_path = None
+        with archive.open(workbook_path) as f:
+            for _, element in iterparse(f):
+                if _local(element.tag) == 'sheet' and element.get('name') == sheet_name:
+                    sheet_path = workbook_rels.get(_rel_id(element), (None, None))[1]
+                    break
+
+        if sheet_path is None or sheet_path not in archive.NameToInfo:
+            return None
+
+        styles_path = next((target for rel_type, target in workbook_rels.values() if rel_type == 'styles'), None)
+        style_codes = _style_fill_codes(archive=archive, styles_path=styles_path)
+        shared_strings_path = next(
+            (target for rel_type, target in workbook_rels.values() if rel_type == 'sharedStrings'), None
+        )
+
+        scanner = _ColumnScanner(
+            resolve_header=lambda cells: min((col for col, value in _header_values(
+                archive=archive, shared_strings_path=shared_strings_path, cells=cells
+            ).items() if value == column_name), default=None),
+            style_codes=style_codes,
+            max_rows=max_rows
+        )
+
+        with archive.open(sheet_path) as f:
+            return scanner.scan(f)
+
+class _StopScan(Exception):
+    pass
+
+class _ColumnScanner:
+    '''
+    Stream a worksheet XML with expat and keep only the style of cells in one column
+    After the header row only start tags are handled, no element objects or text are built
+    '''
+
+    def __init__(self, resolve_header: Callable[[list], Union[int, None]], style_codes: List[int], max_rows: int):
+        '''
+        :param resolve_header: function of the header cells [(column, cell type, text)] returning the target column
+        :param style_codes: fill code of every cell style
+        :param max_rows: max number of rows after the header
+        '''
+
+        self.resolve_header = resolve_header
+        self.style_codes : List[int] = style_codes
+        self.max_row : int = max_rows + 1
+
+        self.fills : array = array('b')
+        self.target_col : Union[int, None] = None
+        self.header_cells : List[Tuple[int, Union[str, None], str]] = []
+        self.header_done : bool = False
+
+        self.parser = None
+        self.row : int = 0
+        self.col : int = 0
+        self.cell_type : Union[str, None] = None
+        self.text : List[str] = []  # text of the header cell being read
+        self.capture : bool = False  # inside <v> or <t> of a header cell
+        self.phonetic : bool = False  # inside <rPh>, not part of the text
+
+    def scan(self, f: IO[bytes]) -> Union[array, None]:
+        '''
+        :param f: binary file object of the worksheet XML
+        :return: array of fill codes, or None if the column is not found in the header
+        '''
+
+        self.parser = expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self._start
+        self.parser.EndElementHandler = self._end
+        self.parser.CharacterDataHandler = self._data
+
+        try:
+            self.parser.ParseFile(f)
+            if not self.header_done:
+                self._finish_header()
+        except _StopScan:
+            pass
+
+        return self.fills if self.target_col is not None else None
+
+    def _finish_header(self) -> None:
+        self.header_done = True
+        # text is only needed in the header
+        self.parser.EndElementHandler = None
+        self.parser.CharacterDataHandler = None
+
+        self.target_col = self.resolve_header(self.header_cells)
+        if self.target_col is None:
+            raise _StopScan()
+
+    def _start(self, name: str, attrs: dict) -> None:
+        name = name.rpartition(':')[2]
+
+        if name == 'c':
+            ref = attrs.get('r')
+            self.col = _column_index(ref) if ref else self.col + 1
+
+            if self.row == 1:
+                self.cell_type = attrs.get('t')
+                self.text = []
+            elif self.col == self.target_col:
+                style = int(attrs.get('s', 0))  # a cell without `s=` has cell style 0, like in openpyxl
+                self.fills[-1] = self.style_codes[style] if style < len(self.style_codes) else FILL_NONE
+
+        elif name == 'row':
+            row = int(attrs.get('r', self.row + 1))
+            self.col = 0
+
+            if row > 1:
+                if not self.header_done:
+                    self._finish_header()
+                if row > self.max_row:
+                    raise _StopScan()
+
+                # rows without any cell count as no fill, so does the current row until a styled cell is found
+                self.fills.extend([FILL_NONE] * (row - max(self.row, 1)))
+
+            self.row = row
+
+        elif self.row == 1:
+            if name in ('v', 't'):
+                self.capture = True
+            elif name == 'rPh':
+                self.phonetic = True
+
+    def _end(self, name: str) -> None:
+        if self.row != 1:
+            return
+
+        name = name.rpartition(':')[2]
+        if name == 'c':
+            self.header_cells.append((self.col, self.cell_type, ''.join(self.text)))
+        elif name in ('v', 't'):
+            self.capture = False
+        elif name == 'rPh':
+            self.phonetic = False
+
+    def _data(self, data: str) -> None:
+        if self.capture and not self.phonetic:
+            self.text.append(data)
+
+def _local(tag: str) -> str:
+    # tag or attribute name without namespace
+    return tag.rsplit('}', 1)[-1]
+
+def _rel_id(element: Element) -> Union[str, None]:
+    return next((value for key, value in element.attrib.items() if _local(key) == 'id'), None)
+
+def _office_document_path(archive: zipfile.ZipFile) -> str:
+    # path of workbook.xml, normally xl/workbook.xml
+    try:
+        rels = _relationships(archive=archive, part_path='')
+    except KeyError:
+        return 'xl/workbook.xml'
+    return next((target for rel_type, target in rels.values() if rel_type == 'officeDocument'), 'xl/workbook.xml')
+
+def _relationships(archive: zipfile.ZipFile, part_path: str) -> Dict[str, Tuple[str, str]]:
+    '''
+    Relationships of a part in the package
+
+    :return: dict of {relationship id: (type name such as 'worksheet', absolute target path)}
+    '''
+
+    part_dir, part_name = posixpath.split(part_path)
+    rels_path = posixpath.join(part_dir, '_rels', f'{part_name}.rels')
+
+    rels : Dict[str, Tuple[str, str]] = {}
+    with archive.open(rels_path) as f:
+        for _, element in iterparse(f):
+            if _local(element.tag) != 'Relationship' or element.get('TargetMode') == 'External':
+                continue
+
+            target = element.get('Target', '')
+            if target.startswith('/'):
+                target = target.lstrip('/')
+            else:
+                target = posixpath.normpath(posixpath.join(part_dir, target))
+
+            rels[element.get('Id')] = (element.get('Type', '').rsplit('/', 1)[-1], target)
+
+    return rels
+
+def _style_fill_codes(archive: zipfile.ZipFile, styles_path: Union[str, None]) -> List[int]:
+    '''
+    Parse styles.xml once into a table of fill codes by cell style (the `s=` attribute of a cell)
+
+    :return: list of fill codes, indexed by cell style
+    '''
+
+    if styles_path is None or styles_path not in archive.NameToInfo:
+        return []
+
+    fill_codes : List[int] = []
+    xf_fill_ids : List[int] = []
+    section = None
+
+    with archive.open(styles_path) as f:
+        for event, element in iterparse(f, events=('start', 'end')):
+            name = _local(element.tag)
+
+            if event == 'start':
+                if name in ('fills', 'cellXfs', 'cellStyleXfs', 'dxfs'):
+                    section = name
+                continue
+
+            if name in ('fills', 'cellXfs', 'cellStyleXfs', 'dxfs'):
+                section = None
+            elif name == 'fill' and section == 'fills':
+                fill_codes.append(_fill_element_code(element))
+                element.clear()
+            elif name == 'xf' and section == 'cellXfs':
+                xf_fill_ids.append(int(element.get('fillId', 0)))
+
+    return [fill_codes[fill_id] if fill_id < len(fill_codes) else FILL_NONE for fill_id in xf_fill_ids]
+
+def _fill_element_code(fill: Element) -> int:
+    # fill code of a <fill> element, by the foreground colour of its pattern fill as openpyxl `start_color`
+    pattern = next((child for child in fill if _local(child.tag) == 'patternFill'), None)
+    if pattern is None:
+        return FILL_NONE if len(fill) == 0 else FILL_OTHER  # gradient fill
+
+    fg_color = next((child for child in pattern if _local(child.tag) == 'fgColor'), None)
+    if fg_color is None:
+        return color_code(None)
+
+    if fg_color.get('indexed') is not None:
+        return color_code(int(fg_color.get('indexed')))
+    if fg_color.get('theme') is not None:
+        return color_code(int(fg_color.get('theme')))
+    if fg_color.get('auto') is not None:
+        return FILL_OTHER
+
+    rgb = fg_color.get('rgb', '00000000')
+    return color_code('00' + rgb if len(rgb) == 6 else rgb)
+
+def _string_item_text(item: Element) -> str:
+    # text of a <si> or <is> element, runs joined and phonetic runs skipped
+    text = []
+    for child in item:
+        name = _local(child.tag)
+        if name == 't':
+            text.append(child.text or '')
+        elif name == 'r':
+            text.extend(t.text or '' for t in child if _local(t.tag) == 't')
+    return ''.join(text)
+
+def _column_index(ref: str) -> int:
+    # 1-based column of a cell reference, e.g. 'AB12' -> 28
+    col = 0
+    for ch in ref:
+        if 'A' <= ch <= 'Z':
+            col = col * 26 + ord(ch) - 64
+        else:
+            break
+    return col
+
+def _header_values(archive: zipfile.ZipFile, shared_strings_path: Union[str, None],
+                   cells: List[Tuple[int, Union[str, None], str]]) -> Dict[int, str]:
+    '''
+    String values of the header cells, reading shared strings only up to the largest index used
+
+    :param cells: list of (column, cell type, text of <v> or inline string)
+    :return: dict of {column: value}
+    '''
+
+    needed : Dict[int, List[int]] = {}  # {shared string index: columns}
+    header : Dict[int, str] = {}
+
+    for col, cell_type, text in cells:
+        if cell_type == 's' and text.strip().isdigit():
+            needed.setdefault(int(text), []).append(col)
+        elif cell_type in ('inlineStr', 'str'):
+            header[col] = text
+
+    if needed and shared_strings_path is not None and shared_strings_path in archive.NameToInfo:
+        last = max(needed)
+        index = 0
+        with archive.open(shared_strings_path) as f:
+            for _, element in iterparse(f):
+                if _local(element.tag) != 'si':
+                    continue
+                if index in needed:
+                    for col in needed[index]:
+                        header[col] = _string_item_text(element)
+                element.clear()
+                if index >= last:
+                    break
+                index += 1
+
+    return header
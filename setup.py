@@ -29,6 +29,9 @@ setup(
         "tabulate~=0.9.0",
         "xlrd~=2.0.0",
     ],
+    extras_require={
+        "arrow": ["pyarrow"],
+    },
     platforms="any",
     python_requires=">=3.9"
 )
@@ -0,0 +1,45 @@
+# Shared fixtures: synthetic result summary and requirement folders, and a workbook with unusual fills
+
+from openpyxl.styles import PatternFill, Color
+
+from benchmarks.generate import build, GeneratedData
+from cosmicexcelchecker.conf import CFP_SHEET_NAMES, CFP_COLUMN_NAME, SUB_PROCESS_NAME, SR_COSMIC_REQ_NAME
+
+import os
+import openpyxl
+import pytest
+
+@pytest.fixture(scope='session')
+def generated_data(tmp_path_factory) -> GeneratedData:
+    # small generated data, some requirements are wrong on purpose
+    return build(root=str(tmp_path_factory.mktemp('generated')), requirements=9, rows=25, error_rate=0.4,
+                 extra_sheets=1, seed=7)
+
+@pytest.fixture(scope='session')
+def fill_workbook(tmp_path_factory) -> str:
+    '''
+    A cosmic requirement workbook whose sub-process column has every kind of fill and value:
+    rgb, theme and indexed colours, wrong CFP values, missing cells, text CFP and a row past the CFP column
+    '''
+
+    path = os.path.join(str(tmp_path_factory.mktemp('fills')), 'fills.xlsx')
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = CFP_SHEET_NAMES[0]
+    ws.append([SR_COSMIC_REQ_NAME, '功能用户', SUB_PROCESS_NAME, CFP_COLUMN_NAME])
+
+    fills = [
+        ('FFFFFF00', 0), ('FFFFFF00', 1), ('FFFF0000', 1 / 3), ('FFFF0000', 1), (None, 1), (None, 2),
+        (Color(theme=4), 1), (Color(indexed=13), 0), (Color(indexed=9), 1), (Color(indexed=9), 0),
+        ('FF0000', 1), ('FF00B050', 1), (None, 'abc'), (None, None), ('FFFFFF00', None),
+    ]
+    for i, (color, cfp) in enumerate(fills):
+        ws.append(['需求' if i == 0 else None, '用户', f'子过程{i}' if i % 4 != 3 else None, cfp])
+        if color is not None:
+            ws.cell(row=i + 2, column=3).fill = PatternFill('solid', start_color=color)
+
+    ws.cell(row=len(fills) + 5, column=1).value = 'tail'  # rows after the last filled sub-process
+    wb.save(path)
+
+    return path
@@ -0,0 +1,62 @@
+# BatchResultSummary against one ResultSummary per worksheet
+
+from unittest import mock
+
+from cosmicexcelchecker.cosmic import ResultSummary, BatchResultSummary
+
+import os
+import openpyxl
+import pandas as pd
+import pytest
+
+@pytest.fixture(scope='module')
+def two_sheet_summary(generated_data, tmp_path_factory) -> str:
+    # the generated summary with a copy of its worksheet
+    path = os.path.join(str(tmp_path_factory.mktemp('batch')), 'summary_2.xlsx')
+    wb = openpyxl.load_workbook(generated_data.summary_path)
+    wb.copy_worksheet(wb[generated_data.sheet_name]).title = 'copy'
+    wb.save(path)
+    return path
+
+def single_results(path: str, sheet_name: str, folders_path: str) -> list[dict]:
+    result_summary = ResultSummary(path=path, folders_path=folders_path, sheet_name=sheet_name)
+    result_summary.load_excel()
+    return result_summary.check_all_files()['results']
+
+def test_same_results_as_single_summaries(generated_data, two_sheet_summary):
+    summaries = [(generated_data.summary_path, generated_data.sheet_name),
+                 (two_sheet_summary, generated_data.sheet_name), (two_sheet_summary, 'copy')]
+    batch = BatchResultSummary(summaries=summaries, folders_path=generated_data.folders_path)
+    out = batch.check_all_files()
+
+    assert list(out['results']) == [(path.replace('\\', '/'), sheet_name) for path, sheet_name in summaries]
+    for (path, sheet_name), results in out['results'].items():
+        assert results == single_results(path=path, sheet_name=sheet_name, folders_path=generated_data.folders_path)
+
+    # every requirement file is loaded once for all three worksheets
+    assert out['loaded'] == len(generated_data.cosmic_paths) + len(generated_data.noncosmic_paths)
+
+def test_summary_file_opened_once(generated_data, two_sheet_summary):
+    opened = []
+    excel_file = pd.ExcelFile
+
+    def counted_excel_file(*args, **kwargs):
+        opened.append(args[0] if args else kwargs.get('path_or_buffer'))
+        return excel_file(*args, **kwargs)
+
+    batch = BatchResultSummary(summaries=[(two_sheet_summary, generated_data.sheet_name), (two_sheet_summary, 'copy')],
+                               folders_path=generated_data.folders_path)
+    with mock.patch('cosmicexcelchecker.cosmic.pd.ExcelFile', side_effect=counted_excel_file):
+        batch.load_excel()
+
+    assert len(opened) == 1
+    assert batch.result_summaries[0].data_frames is batch.result_summaries[1].data_frames
+
+def test_repeated_summary(generated_data):
+    summary = (generated_data.summary_path, generated_data.sheet_name)
+    batch = BatchResultSummary(summaries=[summary, summary], folders_path=generated_data.folders_path)
+    out = batch.check_all_files()
+
+    assert len(batch.result_summaries) == 1
+    assert out['results'][summary] == single_results(path=summary[0], sheet_name=summary[1],
+                                                     folders_path=generated_data.folders_path)
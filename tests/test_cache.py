@@ -0,0 +1,113 @@
+# On-disk ParseCache: hits, misses on changed files, LRU eviction and loading through the cache
+
+from cosmicexcelchecker.cache import ParseCache, EVICT_TARGET_RATIO
+from cosmicexcelchecker.cosmic import CosmicReqExcel, NonCosmicReqExcel
+
+import os
+import pandas as pd
+
+def entry_sizes(cache: ParseCache) -> dict[str, int]:
+    return {name: os.path.getsize(os.path.join(cache.cache_dir, name))
+            for name in os.listdir(cache.cache_dir) if name.endswith('.pkl')}
+
+def test_hit_and_miss(tmp_path):
+    source = tmp_path / 'source.xlsx'
+    source.write_bytes(b'first')
+    cache = ParseCache(cache_dir=str(tmp_path / 'cache'))
+
+    assert cache.get(path=str(source)) is None
+    cache.put(path=str(source), data={'value': 1})
+    assert cache.get(path=str(source)) == {'value': 1}
+
+    # variant and precomputed key
+    assert cache.get(path=str(source), variant='other') is None
+    key = ParseCache.fingerprint(path=str(source))
+    assert cache.get(path=str(source), key=key) == {'value': 1}
+    assert ParseCache.fingerprint(path=str(source), content=b'first') == key
+
+    # a changed file is a miss
+    source.write_bytes(b'second')
+    assert cache.get(path=str(source)) is None
+
+def test_corrupted_entry_is_a_miss(tmp_path):
+    source = tmp_path / 'source.xlsx'
+    source.write_bytes(b'data')
+    cache = ParseCache(cache_dir=str(tmp_path / 'cache'))
+    cache.put(path=str(source), data={'value': 1})
+
+    key = ParseCache.fingerprint(path=str(source))
+    with open(os.path.join(cache.cache_dir, f'{key}.pkl'), 'wb') as f:
+        f.write(b'not a pickle')
+
+    assert cache.get(path=str(source)) is None
+    assert entry_sizes(cache) == {}
+
+def test_evict_least_recently_used(tmp_path):
+    source = tmp_path / 'source.xlsx'
+    source.write_bytes(b'data')
+    cache = ParseCache(cache_dir=str(tmp_path / 'cache'), max_bytes=10 ** 9)
+
+    for i in range(10):
+        cache.put(path=str(source), data={'pad': b'0' * 1000}, variant=str(i))
+        # distinct mtimes, so the order of use does not depend on the file system resolution
+        os.utime(os.path.join(cache.cache_dir, f'{ParseCache.fingerprint(path=str(source), variant=str(i))}.pkl'),
+                 ns=(i * 10 ** 9, i * 10 ** 9))
+
+    assert cache.get(path=str(source), variant='0') is not None  # most recently used now
+    entry_size = max(entry_sizes(cache).values())
+
+    cache.max_bytes = 5 * entry_size
+    cache.put(path=str(source), data={'pad': b'0' * 1000}, variant='new')
+
+    left = entry_sizes(cache)
+    assert sum(left.values()) <= EVICT_TARGET_RATIO * cache.max_bytes
+    assert cache.get(path=str(source), variant='0') is not None
+    assert cache.get(path=str(source), variant='new') is not None
+    assert cache.get(path=str(source), variant='1') is None  # least recently used
+
+def test_running_total_matches_directory(tmp_path):
+    source = tmp_path / 'source.xlsx'
+    source.write_bytes(b'data')
+    cache = ParseCache(cache_dir=str(tmp_path / 'cache'), max_bytes=50_000)
+
+    scans = []
+    evict = cache.evict
+
+    def counted_evict():
+        scans.append(1)
+        evict()
+
+    cache.evict = counted_evict
+
+    for i in range(300):
+        cache.put(path=str(source), data={'pad': b'0' * 1000}, variant=str(i % 200))  # some entries replaced
+
+    sizes = entry_sizes(cache)
+    assert sum(sizes.values()) <= cache.max_bytes
+    assert cache._total_bytes == sum(sizes.values())
+    assert len(scans) < 300 // 4  # the directory is not scanned on every put
+
+    cache.clear()
+    assert entry_sizes(cache) == {} and cache._total_bytes == 0
+
+def test_load_excel_through_cache(generated_data, tmp_path):
+    cache = ParseCache(cache_dir=str(tmp_path / 'cache'))
+
+    for excel_class, paths in ((CosmicReqExcel, generated_data.cosmic_paths),
+                               (NonCosmicReqExcel, generated_data.noncosmic_paths)):
+        for path in paths:
+            expected = excel_class(path=path)
+            expected.load_excel(selective=True)
+
+            for _ in range(2):  # miss, then hit
+                cached = excel_class(path=path)
+                cached.load_excel(selective=True, parse_cache=cache)
+
+                assert cached.data_frames.keys() == expected.data_frames.keys()
+                for sheet_name, df in expected.data_frames.items():
+                    pd.testing.assert_frame_equal(cached.data_frames[sheet_name], df)
+                if excel_class is CosmicReqExcel:
+                    assert list(cached.cfp_fills) == list(expected.cfp_fills)
+                    assert cached.check_highlight_cfp() == expected.check_highlight_cfp()
+
+    assert len(entry_sizes(cache)) == len(generated_data.cosmic_paths) + len(generated_data.noncosmic_paths)
@@ -0,0 +1,89 @@
+# Bulk export of check results and the annotated copy of the result summary
+
+from cosmicexcelchecker.cosmic import ResultSummary
+from cosmicexcelchecker.export import results_to_frame, write_results, read_results, write_annotated_summary
+from cosmicexcelchecker.errors import IncorrectFileTypeException
+from cosmicexcelchecker.conf import RS_SKIP_ROWS
+
+import openpyxl
+import pandas as pd
+import pytest
+
+@pytest.fixture(scope='module')
+def checked(generated_data) -> tuple[ResultSummary, dict]:
+    result_summary = ResultSummary(path=generated_data.summary_path, folders_path=generated_data.folders_path,
+                                   sheet_name=generated_data.sheet_name)
+    result_summary.load_excel()
+    return result_summary, result_summary.check_all_files(profile=True)
+
+def test_results_to_frame(checked):
+    result_summary, out = checked
+    frame = results_to_frame(out['results'])
+
+    assert frame["REQ Num"].tolist() == [result["REQ Num"] for result in out['results']]
+    assert frame["note"].tolist() == [result["note"] for result in out['results']]
+    assert {f'stage_{name}' for name in out['results'][0]['stages']} <= set(frame.columns)
+
+    records = result_summary.check_all_files(as_record=True)['results']
+    pd.testing.assert_frame_equal(results_to_frame(records), results_to_frame(result_summary.check_all_files()['results']))
+
+@pytest.mark.parametrize('extension', ['.csv', '.parquet', '.feather'])
+def test_round_trip(checked, tmp_path, extension):
+    if extension != '.csv':
+        pytest.importorskip('pyarrow')
+
+    _, out = checked
+    path = str(tmp_path / f'results{extension}')
+    written = write_results(out['results'], path)
+    read = read_results(path)
+
+    assert '' in read["note"].tolist()  # clean rows keep an empty note
+    pd.testing.assert_frame_equal(read, written, check_dtype=False)
+
+def test_result_file_type(tmp_path):
+    with pytest.raises(IncorrectFileTypeException):
+        write_results([], str(tmp_path / 'results.txt'))
+
+def test_annotated_summary(checked, generated_data, tmp_path):
+    result_summary, out = checked
+    path = str(tmp_path / 'annotated.xlsx')
+    write_annotated_summary(result_summary, out['results'], path)
+
+    source = openpyxl.load_workbook(generated_data.summary_path)[generated_data.sheet_name]
+    annotated = openpyxl.load_workbook(path)[generated_data.sheet_name]
+
+    # every original cell is kept, including the title rows above the header
+    assert all(annotated.cell(row=row, column=column).value == source.cell(row=row, column=column).value
+               for row in range(1, source.max_row + 1) for column in range(1, source.max_column + 1))
+    assert annotated.max_column == source.max_column + 2
+
+    df = pd.read_excel(path, sheet_name=generated_data.sheet_name, skiprows=range(RS_SKIP_ROWS))
+    assert df['match'].tolist() == [result['match'] for result in out['results']]
+    assert df['note'].fillna('').tolist() == [result['note'] for result in out['results']]
+
+def test_annotated_summary_keeps_other_sheets(generated_data, tmp_path):
+    summary_path = str(tmp_path / 'summary.xlsx')
+    wb = openpyxl.load_workbook(generated_data.summary_path)
+    wb.create_sheet('other')['A1'] = 'kept'
+    wb.save(summary_path)
+
+    result_summary = ResultSummary(path=summary_path, folders_path=generated_data.folders_path,
+                                   sheet_name=generated_data.sheet_name)
+    result_summary.load_excel()
+    results = result_summary.check_all_files()['results']
+    results[0] = {}  # a row that was not checked
+
+    path = str(tmp_path / 'annotated.xlsx')
+    write_annotated_summary(result_summary, results, path)
+
+    annotated = openpyxl.load_workbook(path)
+    assert annotated.sheetnames == wb.sheetnames
+    assert annotated['other']['A1'].value == 'kept'
+
+    sheet = annotated[generated_data.sheet_name]
+    assert sheet.cell(row=RS_SKIP_ROWS + 2, column=sheet.max_column).value.startswith('Not checked')
+
+    with pytest.raises(ValueError):
+        write_annotated_summary(result_summary, results[1:], path)
+    with pytest.raises(IncorrectFileTypeException):
+        write_annotated_summary(result_summary, results, str(tmp_path / 'annotated.csv'))
@@ -0,0 +1,99 @@
+# os.scandir based FindExcels against the recursive glob it replaced, and FileIndex revalidation
+
+from cosmicexcelchecker.find import FindExcels, FileIndex
+from cosmicexcelchecker.conf import SR_SUBFOLDER_NAME, SR_COSMIC_FILE_PREFIX, SR_NONCOSMIC_FILE_PREFIX
+
+import os
+import glob
+import time
+import pytest
+
+def reference_find(path: str) -> list[str]:
+    # FindExcels.find_excels before the scanner: recursive glob filtered by extension.
+    # glob also returned folders named like Excel files, the scanner only returns files
+    return [filename.replace('\\', '/') for filename in glob.iglob(pathname=path + '/**/*', recursive=True)
+            if filename.endswith(('.xlsx', '.xls', '.csv')) and not os.path.isdir(filename)]
+
+@pytest.fixture
+def folders(tmp_path) -> str:
+    # requirement folders with attachments, nested folders, hidden entries and Excel-like folder names
+    root = tmp_path / 'folders'
+    for req_num in range(1, 8):
+        subfolder = root / str(req_num) / SR_SUBFOLDER_NAME
+        subfolder.mkdir(parents=True)
+        (subfolder / f'{SR_COSMIC_FILE_PREFIX}：评估{req_num}.xlsx').write_bytes(b'x')
+        (subfolder / f'{SR_NONCOSMIC_FILE_PREFIX}：评估{req_num}.xls').write_bytes(b'x')
+        (subfolder / f'附件{req_num}.pdf').write_bytes(b'x' * 100)
+        (subfolder / '.~lock.xlsx').write_bytes(b'x')
+        (root / str(req_num) / f'说明{req_num}.csv').write_bytes(b'x')
+        (root / str(req_num) / 'old' / 'deep').mkdir(parents=True)
+        (root / str(req_num) / 'old' / 'deep' / f'{SR_COSMIC_FILE_PREFIX}旧.xlsx').write_bytes(b'x')
+        (subfolder / 'inner').mkdir()
+        (subfolder / 'inner' / f'{SR_COSMIC_FILE_PREFIX}内.xlsx').write_bytes(b'x')
+
+    (root / '.hidden').mkdir()
+    (root / '.hidden' / 'a.xlsx').write_bytes(b'x')
+    (root / 'folder.xlsx').mkdir()
+    (root / 'top.xlsx').write_bytes(b'x')
+
+    return str(root).replace('\\', '/')
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_find_matches_glob(folders, max_workers):
+    expected = reference_find(folders)
+
+    assert FindExcels.find_excels(path=folders, max_workers=max_workers) == expected
+    assert FindExcels.find_excels(path=folders + '/', max_workers=max_workers) == expected
+    assert FindExcels.find_excels(path=folders + '/**/*', max_workers=max_workers) == expected
+    assert sorted(FindExcels.iter_excels(path=folders, max_workers=max_workers, ordered=False)) == sorted(expected)
+
+def test_subfolder_only(folders):
+    expected = [path for path in reference_find(folders) if path.rsplit('/', 2)[-2] == SR_SUBFOLDER_NAME]
+
+    assert FindExcels.find_excels(path=folders, subfolder_only=True) == expected
+    assert FindExcels.find_excels(path=folders, max_workers=3, subfolder_only=True) == expected
+
+def test_index_excels(folders):
+    index = FindExcels.index_excels(path=folders, file_paths=FindExcels.find_excels(path=folders))
+
+    files = index['3']
+    assert len(files) == 5
+    assert {req_file.kind for req_file in files} == {'cosmic', 'noncosmic', None}
+    assert [req_file.in_subfolder for req_file in files if req_file.path.endswith('.xls')] == [True]
+    assert all(req_file.path.startswith(folders + '/3/') for req_file in files)
+
+def set_old_mtimes(path: str) -> None:
+    # folders modified long enough ago are trusted by FileIndex (see FileIndex.RACY_NS)
+    past = time.time() - 600
+    for folder, _, _ in os.walk(path):
+        os.utime(folder, (past, past))
+
+def test_file_index_revalidation(folders, tmp_path):
+    set_old_mtimes(folders)
+    index_path = str(tmp_path / 'index.json')
+
+    file_index = FileIndex(path=folders, index_path=index_path)
+    assert file_index.refresh() > 0
+    assert file_index.file_paths == FindExcels.find_excels(path=folders)
+    assert file_index.refresh() == 0  # nothing changed
+
+    # a persisted index only lists changed folders
+    subfolder = f'{folders}/2/{SR_SUBFOLDER_NAME}'
+    os.remove(f'{subfolder}/{SR_NONCOSMIC_FILE_PREFIX}：评估2.xls')
+    with open(f'{subfolder}/{SR_COSMIC_FILE_PREFIX}：新.xlsx', 'wb') as f:
+        f.write(b'x')
+    past = time.time() - 300
+    os.utime(subfolder, (past, past))
+
+    reloaded = FileIndex(path=folders, index_path=index_path)
+    assert reloaded.folders == file_index.folders
+    assert reloaded.refresh() == 1
+    assert reloaded.rescanned == [f'2/{SR_SUBFOLDER_NAME}']
+    assert reloaded.file_paths == FindExcels.find_excels(path=folders)
+    assert reloaded.req_index() == FindExcels.index_excels(path=folders, file_paths=FindExcels.find_excels(path=folders))
+
+def test_file_index_recent_folders_rescanned(folders):
+    # folders modified within the mtime resolution are listed again on every refresh
+    file_index = FileIndex(path=folders)
+    file_index.refresh()
+    assert file_index.refresh() == len(file_index.folders)
@@ -0,0 +1,87 @@
+# One parse of a requirement workbook feeds both the pandas checks and the highlight check
+
+from typing import Union
+
+from cosmicexcelchecker.cosmic import CosmicReqExcel, NonCosmicReqExcel
+from cosmicexcelchecker.conf import CFP_SHEET_NAMES, CFP_COLUMN_NAME, SUB_PROCESS_NAME
+
+import openpyxl
+import pandas as pd
+import pytest
+
+def reference_highlight(path: str, cfp_df: pd.DataFrame) -> list[str]:
+    # check_highlight_cfp as it was before the single-pass loader, opening the workbook again with openpyxl
+    excel = openpyxl.load_workbook(path)
+    sheet = next(excel[sheet_name] for sheet_name in CFP_SHEET_NAMES if sheet_name in excel)
+
+    sp_idx = cfp_df.columns.get_loc(SUB_PROCESS_NAME)
+    cfp_idx = cfp_df.columns.get_loc(CFP_COLUMN_NAME)
+
+    err_list : list[str] = []
+    row_num = 1
+    for row in sheet.iter_rows(min_row=2, max_row=len(cfp_df.index) + 1, min_col=sp_idx + 1, max_col=sp_idx + 1):
+        row_num += 1
+        sp_color_hex : Union[str, int] = row[0].fill.start_color.index
+        cfp_cell = str(cfp_df.iloc[row_num - 2, cfp_idx])
+
+        if sp_color_hex == "":
+            continue
+        if cfp_cell == "":
+            err_list.append(f'{row_num} Missing Data')
+            continue
+        try:
+            cfp_cell = float(cfp_cell)
+        except ValueError:
+            err_list.append(f'{row_num} CFP not a number')
+            continue
+
+        if sp_color_hex == 'FFFFFF00' and cfp_cell != 0:
+            err_list.append(f'{row_num} Yellow != 0')
+        elif sp_color_hex == 'FFFF0000' and abs(cfp_cell - 1/3) >= 0.01:
+            err_list.append(f'{row_num} Red != 1/3 or 0.333')
+        elif (sp_color_hex == '00000000' or (type(sp_color_hex) is int and sp_color_hex == 9)) and cfp_cell != 1:
+            err_list.append(f'{row_num} No fill (White) != 1')
+
+    return err_list
+
+def cosmic_paths(generated_data, fill_workbook) -> list[str]:
+    return generated_data.cosmic_paths + [fill_workbook]
+
+def test_frames_match_read_excel(generated_data):
+    for path in generated_data.cosmic_paths:
+        excel = CosmicReqExcel(path=path)
+        excel.load_excel()
+
+        expected = pd.read_excel(path, sheet_name=None)
+        assert excel.data_frames.keys() == expected.keys()
+        for sheet_name, df in expected.items():
+            pd.testing.assert_frame_equal(excel.data_frames[sheet_name], df)
+
+@pytest.mark.parametrize('selective', [False, True])
+def test_highlight_matches_openpyxl(generated_data, fill_workbook, selective):
+    for path in cosmic_paths(generated_data, fill_workbook):
+        excel = CosmicReqExcel(path=path)
+        excel.load_excel(selective=selective)
+
+        # the reference looks up columns by position in the sheet, so it needs all columns
+        cfp_df = pd.read_excel(path, sheet_name=CFP_SHEET_NAMES[0])
+        assert excel.check_highlight_cfp() == reference_highlight(path=path, cfp_df=cfp_df)
+
+def test_highlight_without_loaded_fills(fill_workbook):
+    # fills skipped by load_excel are read when the check needs them
+    excel = CosmicReqExcel(path=fill_workbook)
+    excel.load_excel(load_highlight=False)
+
+    assert excel.check_highlight_cfp() == reference_highlight(path=fill_workbook,
+                                                              cfp_df=excel.data_frames[CFP_SHEET_NAMES[0]])
+
+def test_noncosmic_selective(generated_data):
+    for path in generated_data.noncosmic_paths:
+        full = NonCosmicReqExcel(path=path)
+        full.load_excel()
+        selective = NonCosmicReqExcel(path=path)
+        selective.load_excel(selective=True)
+
+        for sheet_name, df in selective.data_frames.items():
+            pd.testing.assert_frame_equal(df, full.data_frames[sheet_name][df.columns])  # only needed columns
+        assert selective.get_req_name() == full.get_req_name()
@@ -0,0 +1,113 @@
+# Edit distance kernels of CheckObf against the plain full-matrix dp
+
+from cosmicexcelchecker.obf import CheckObf
+
+import random
+import numpy as np
+import pytest
+
+ALPHABETS = ('ab', 'abcdef', '需求名称功能子过程ab')
+
+def reference_distance(string1: str, string2: str) -> int:
+    # full (len1 + 1) * (len2 + 1) Levenshtein dp, as CheckObf.compare did before the fast kernels
+    dp = [[0] * (len(string2) + 1) for _ in range(len(string1) + 1)]
+    for i in range(len(string1) + 1):
+        dp[i][0] = i
+    for j in range(len(string2) + 1):
+        dp[0][j] = j
+    for i in range(1, len(string1) + 1):
+        for j in range(1, len(string2) + 1):
+            dp[i][j] = min(dp[i - 1][j] + 1, dp[i][j - 1] + 1,
+                           dp[i - 1][j - 1] + (string1[i - 1] != string2[j - 1]))
+    return dp[-1][-1]
+
+def random_pairs(count: int, max_length: int, seed: int) -> list[tuple[str, str]]:
+    # random pairs and pairs of similar strings, lengths from 0 (both kernels special-case empty strings)
+    rng = random.Random(seed)
+    pairs : list[tuple[str, str]] = []
+    for _ in range(count):
+        alphabet = rng.choice(ALPHABETS)
+        string1 = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+        if rng.random() < 0.5:
+            string2 = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+        else:
+            chars = list(string1)
+            for _ in range(rng.randint(0, 3)):
+                i = rng.randint(0, len(chars))
+                if rng.random() < 0.5 or i == len(chars):
+                    chars.insert(i, rng.choice(alphabet))
+                else:
+                    del chars[i]
+            string2 = ''.join(chars)
+        pairs.append((string1, string2))
+    return pairs
+
+def test_compare():
+    for string1, string2 in random_pairs(count=400, max_length=40, seed=1):
+        assert CheckObf.compare(string1, string2) == reference_distance(string1, string2)
+
+def test_compare_long_strings():
+    # bit vectors longer than a machine word
+    for string1, string2 in random_pairs(count=20, max_length=200, seed=2):
+        assert CheckObf.compare(string1, string2) == reference_distance(string1, string2)
+
+@pytest.mark.parametrize('kernel', ['bounded', 'myers', 'banded'])
+def test_bounded(kernel):
+    for string1, string2 in random_pairs(count=300, max_length=30, seed=3):
+        distance = reference_distance(string1, string2)
+        for max_distance in range(0, 8):
+            if kernel == 'bounded':
+                result = CheckObf.compare_bounded(string1, string2, max_distance=max_distance)
+            elif kernel == 'myers':
+                result = CheckObf._myers(string1, string2, max_distance=max_distance)
+            else:
+                result = CheckObf._banded(string1, string2, max_distance=max_distance)
+
+            assert result == min(distance, max_distance + 1)
+
+def test_similarity():
+    for string1, string2 in random_pairs(count=300, max_length=30, seed=4):
+        longer = max(len(string1), len(string2))
+        if longer == 0:
+            continue
+
+        ratio = 1 - reference_distance(string1, string2) / longer
+        assert CheckObf.similarity(string1, string2) == pytest.approx(ratio)
+        for threshold in (0.3, 0.5, 0.8, 0.9, 1.0):
+            assert CheckObf.similarity(string1, string2, ratio=threshold) == (ratio >= threshold - 1e-12)
+
+def test_max_distance():
+    for length in range(1, 60):
+        for ratio in (0.1, 0.33, 0.5, 0.8, 0.95, 1.0):
+            k = CheckObf.max_distance(length=length, ratio=ratio)
+            assert (length - k) / length >= ratio
+            assert k == length or (length - k - 1) / length < ratio
+
+def test_compare_matrix():
+    pairs = random_pairs(count=60, max_length=25, seed=5)
+    strings1 = [string1 for string1, _ in pairs[:30]]
+    strings2 = [string2 for _, string2 in pairs[30:]]
+
+    expected = np.array([[reference_distance(s1, s2) for s2 in strings2] for s1 in strings1])
+    np.testing.assert_array_equal(CheckObf.compare_matrix(strings1, strings2), expected)
+    # small blocks of rows at a time give the same result
+    np.testing.assert_array_equal(CheckObf._compare_block(strings1, strings2, max_cells=1), expected)
+
+def test_match():
+    rng = random.Random(6)
+    candidates = [''.join(rng.choice(ALPHABETS[2]) for _ in range(rng.randint(1, 12))) for _ in range(80)]
+    queries = [candidate[:-1] + 'x' for candidate in candidates[:20]] + ['', '需求']
+
+    for ratio in (0.5, 0.75):
+        results = CheckObf.match(queries=queries, candidates=candidates, ratio=ratio, limit=3)
+        for query, matches in zip(queries, results):
+            # brute force with the reference distance
+            expected = []
+            for idx, candidate in enumerate(candidates):
+                longer = max(len(query), len(candidate))
+                similarity = 1.0 if longer == 0 else (longer - reference_distance(query, candidate)) / longer
+                if similarity >= ratio:
+                    expected.append((idx, similarity))
+            expected.sort(key=lambda match: (-match[1], match[0]))
+
+            assert [idx for idx, _ in matches] == [idx for idx, _ in expected[:3]]
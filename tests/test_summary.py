@@ -0,0 +1,87 @@
+# Requirement row index of ResultSummary against searching the sheet with a boolean mask
+
+from cosmicexcelchecker.cosmic import ResultSummary, ReqRow
+from cosmicexcelchecker.conf import RS_REQ_NUM, RS_REQ_NAME, RS_TOTAL_CFP_NAME, RS_QLF_COSMIC
+
+import os
+import openpyxl
+import pandas as pd
+import pytest
+
+@pytest.fixture(scope='module')
+def summary_path(generated_data, tmp_path_factory) -> str:
+    # the generated summary with a repeated requirement number
+    path = os.path.join(str(tmp_path_factory.mktemp('summary')), 'summary.xlsx')
+    wb = openpyxl.load_workbook(generated_data.summary_path)
+    ws = wb[generated_data.sheet_name]
+    ws.append([row.value for row in ws[ws.max_row - 3]])
+    wb.save(path)
+    return path
+
+@pytest.fixture
+def result_summary(generated_data, summary_path) -> ResultSummary:
+    result_summary = ResultSummary(path=summary_path, folders_path=generated_data.folders_path,
+                                   sheet_name=generated_data.sheet_name)
+    result_summary.load_excel()
+    return result_summary
+
+def mask_rows(df: pd.DataFrame, req_num: object) -> pd.DataFrame:
+    # the lookup of check_file before the index
+    return df.loc[df.index[df[RS_REQ_NUM] == req_num]]
+
+def test_rows_match_mask_lookup(result_summary):
+    df = result_summary.data_frame_specific
+    repeated = 0
+
+    for req_num in df[RS_REQ_NUM].dropna().unique():
+        rows = mask_rows(df=df, req_num=req_num)
+        result = result_summary.check_file(req_num=req_num)
+
+        if len(rows) > 1:
+            repeated += 1
+            assert result == {}
+            continue
+
+        row = rows.iloc[0]
+        assert result_summary._req_rows[req_num] == ReqRow(req_num=row[RS_REQ_NUM], req_name=row[RS_REQ_NAME],
+                                                           total_cfp=row[RS_TOTAL_CFP_NAME],
+                                                           qualified_cosmic=row[RS_QLF_COSMIC])
+        assert result["REQ Num"] == req_num and result["path"] != "Not exist"
+
+    assert repeated == 1
+    assert result_summary.check_file(req_num=10 ** 6) == {}
+
+def test_same_results_in_any_order(result_summary):
+    results = result_summary.check_all_files()['results']
+    req_nums = result_summary.data_frame_specific[RS_REQ_NUM].tolist()
+
+    for req_num, result in reversed(list(zip(req_nums, results))):
+        assert result_summary.check_file(req_num=req_num) == result
+
+@pytest.mark.parametrize('column', [RS_REQ_NUM, RS_QLF_COSMIC])
+def test_missing_column(result_summary, column):
+    # a missing column raises KeyError like the column lookup did, the sheet itself can still be loaded
+    req_num = result_summary.data_frame_specific[RS_REQ_NUM].iloc[0]
+    result_summary.data_frame_specific = result_summary.data_frame_specific.drop(columns=[column])
+
+    with pytest.raises(KeyError):
+        result_summary.check_file(req_num=req_num)
+
+def test_index_follows_changes(result_summary):
+    df = result_summary.data_frame_specific
+    first, second = df[RS_REQ_NUM].iloc[0], df[RS_REQ_NUM].iloc[1]
+    assert result_summary.check_file(req_num=first) != {}
+
+    # rows dropped in place
+    df.drop(index=df.index[0], inplace=True)
+    assert result_summary.check_file(req_num=first) == {}
+
+    # values edited in place need reindex_rows
+    df.loc[df.index[0], RS_REQ_NUM] = first
+    result_summary.reindex_rows()
+    assert result_summary.check_file(req_num=first)["REQ Num"] == first
+    assert result_summary.check_file(req_num=second) == {}
+
+    # a replaced sheet
+    result_summary.data_frame_specific = df.iloc[:0]
+    assert result_summary.check_file(req_num=first) == {}
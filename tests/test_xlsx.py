@@ -0,0 +1,124 @@
+# Fill colours read from the .xlsx XML against openpyxl
+
+from typing import Union
+
+from cosmicexcelchecker.xlsx import read_column_fills, color_code, FILL_NONE, FILL_YELLOW, FILL_RED
+from cosmicexcelchecker.cosmic import CosmicReqExcel
+from cosmicexcelchecker.conf import CFP_SHEET_NAMES, SUB_PROCESS_NAME
+
+import io
+import re
+import zipfile
+import openpyxl
+import pytest
+
+def reference_fills(path: str, sheet_name: str, column_name: str) -> list[int]:
+    # fill code of every cell under the header, by openpyxl (not read-only) up to the last row of the sheet
+    sheet = openpyxl.load_workbook(path)[sheet_name]
+    column = next(cell.column for cell in sheet[1] if cell.value == column_name)
+    return [color_code(sheet.cell(row=row, column=column).fill.start_color.index)
+            for row in range(2, sheet.max_row + 1)]
+
+def rewrite_parts(source: str, target: str, rewrite: dict, add: Union[dict, None] = None) -> None:
+    # copy an .xlsx package, changing some parts with {part name: function of the XML text} and adding others
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(target, 'w') as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename in rewrite:
+                data = rewrite[item.filename](data.decode('utf-8')).encode('utf-8')
+            zout.writestr(item, data)
+        for name, text in (add or {}).items():
+            zout.writestr(name, text)
+
+@pytest.fixture
+def default_style_workbook(fill_workbook, tmp_path) -> str:
+    # cell style 0 has a yellow fill, cells of style 0 have no `s=` attribute (openpyxl does not write it either)
+    def yellow_default(text: str) -> str:
+        count = int(re.search(r'<fills count="(\d+)"', text).group(1))
+        text = text.replace(f'<fills count="{count}">', f'<fills count="{count + 1}">')
+        text = text.replace('</fills>', '<fill><patternFill patternType="solid"><fgColor rgb="FFFFFF00"/>'
+                                        '</patternFill></fill></fills>')
+        return re.sub(r'(<cellXfs[^>]*>\s*<xf[^>]*?)fillId="\d+"', rf'\g<1>fillId="{count}"', text, count=1)
+
+    path = str(tmp_path / 'default_style.xlsx')
+    rewrite_parts(source=fill_workbook, target=path, rewrite={
+        'xl/styles.xml': yellow_default,
+    })
+    return path
+
+def test_matches_openpyxl(generated_data, fill_workbook):
+    for path in generated_data.cosmic_paths + [fill_workbook]:
+        fills = read_column_fills(path=path, sheet_name=CFP_SHEET_NAMES[0], column_name=SUB_PROCESS_NAME, max_rows=10 ** 6)
+        assert list(fills) == reference_fills(path=path, sheet_name=CFP_SHEET_NAMES[0], column_name=SUB_PROCESS_NAME)
+
+def test_cell_without_style_attribute(default_style_workbook):
+    fills = read_column_fills(path=default_style_workbook, sheet_name=CFP_SHEET_NAMES[0],
+                              column_name=SUB_PROCESS_NAME, max_rows=10 ** 6)
+    expected = reference_fills(path=default_style_workbook, sheet_name=CFP_SHEET_NAMES[0], column_name=SUB_PROCESS_NAME)
+
+    assert FILL_YELLOW in expected
+    assert list(fills) == expected
+
+def test_max_rows_and_file_object(fill_workbook):
+    expected = reference_fills(path=fill_workbook, sheet_name=CFP_SHEET_NAMES[0], column_name=SUB_PROCESS_NAME)
+    with open(fill_workbook, 'rb') as f:
+        content = f.read()
+
+    fills = read_column_fills(path=io.BytesIO(content), sheet_name=CFP_SHEET_NAMES[0], column_name=SUB_PROCESS_NAME,
+                              max_rows=5)
+    assert list(fills) == expected[:5]
+
+def test_missing_sheet_or_column(fill_workbook):
+    assert read_column_fills(path=fill_workbook, sheet_name='nope', column_name=SUB_PROCESS_NAME, max_rows=10) is None
+    assert read_column_fills(path=fill_workbook, sheet_name=CFP_SHEET_NAMES[0], column_name='nope', max_rows=10) is None
+
+def test_shared_string_header(fill_workbook, tmp_path):
+    # header cells as shared strings (as written by Excel) instead of inline strings (as written by openpyxl),
+    # the sub-process header split in runs with a phonetic run that is not part of the text
+    shared : list[str] = []
+
+    def to_shared(match) -> str:
+        text = match.group(3)
+        if text == f'<t>{SUB_PROCESS_NAME}</t>':
+            text = f'<r><t>{SUB_PROCESS_NAME[:2]}</t></r><r><t>{SUB_PROCESS_NAME[2:]}</t></r><rPh sb="0" eb="1"><t>x</t></rPh>'
+        shared.append(f'<si>{text}</si>')
+        return f'<c r="{match.group(1)}"{match.group(2)} t="s"><v>{len(shared) - 1}</v></c>'
+
+    with zipfile.ZipFile(fill_workbook) as archive:
+        sheet_xml = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    sheet_xml = re.sub(r'<c r="([A-Z]+1)"([^>]*?) t="inlineStr"><is>(.*?)</is></c>', to_shared, sheet_xml)
+
+    path = str(tmp_path / 'shared.xlsx')
+    rewrite_parts(source=fill_workbook, target=path, rewrite={
+        'xl/worksheets/sheet1.xml': lambda text: sheet_xml,
+        'xl/_rels/workbook.xml.rels': lambda text: text.replace('</Relationships>', (
+            '<Relationship Id="rIdShared" Target="sharedStrings.xml" Type="http://schemas.openxmlformats.org/'
+            'officeDocument/2006/relationships/sharedStrings"/></Relationships>')),
+        '[Content_Types].xml': lambda text: text.replace('</Types>', (
+            '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.'
+            'spreadsheetml.sharedStrings+xml"/></Types>')),
+    }, add={
+        'xl/sharedStrings.xml': '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                                f'{"".join(shared)}</sst>',
+    })
+
+    assert openpyxl.load_workbook(path)[CFP_SHEET_NAMES[0]]['C1'].value == SUB_PROCESS_NAME
+    fills = read_column_fills(path=path, sheet_name=CFP_SHEET_NAMES[0], column_name=SUB_PROCESS_NAME, max_rows=10 ** 6)
+    assert list(fills) == reference_fills(path=fill_workbook, sheet_name=CFP_SHEET_NAMES[0], column_name=SUB_PROCESS_NAME)
+
+def test_fill_engines_agree(generated_data, fill_workbook, default_style_workbook):
+    for path in generated_data.cosmic_paths + [fill_workbook, default_style_workbook]:
+        by_openpyxl = CosmicReqExcel(path=path)
+        by_openpyxl.load_excel(selective=True)
+        by_xml = CosmicReqExcel(path=path)
+        by_xml.load_excel(selective=True, fill_engine='xml')
+
+        assert list(by_xml.cfp_fills) == list(by_openpyxl.cfp_fills)
+        assert by_xml.check_highlight_cfp() == by_openpyxl.check_highlight_cfp()
+
+def test_color_code():
+    assert color_code(None) == FILL_NONE
+    assert color_code('00000000') == FILL_NONE
+    assert color_code(9) == FILL_NONE
+    assert color_code('FFFFFF00') == FILL_YELLOW
+    assert color_code('FFFF0000') == FILL_RED